@@ -1,4 +1,5 @@
 import streamlit as st
+import pandas as pd
 import datetime
 
 from src.utils.utils import utils
@@ -38,10 +39,12 @@ start_date = st.sidebar.date_input(
 )
 end_date = st.sidebar.date_input("End date", datetime.date.today())
 
+rowids = source.search_articles(search)
+if rowids is not None:
+    df = df[df[DataSchema.ROWID].isin(rowids)]
 df = df[
-    (df[DataSchema.SEARCH].str.contains(search.lower()))
-    & (df[DataSchema.DATE] >= start_date)
-    & (df[DataSchema.DATE] <= end_date)
+    (df[DataSchema.DATE] >= pd.Timestamp(start_date))
+    & (df[DataSchema.DATE] <= pd.Timestamp(end_date))
 ].reset_index(drop=True)
 
 # if authentication_status:
@@ -50,7 +53,7 @@ with st.spinner("Loading feed..."):
         mui_card(
             title=df.loc[article][DataSchema.MAIN],
             content=df.loc[article][DataSchema.SUMMARY],
-            date=df.loc[article][DataSchema.DATE],
+            date=df.loc[article][DataSchema.DATE].date(),
             link=df.loc[article][DataSchema.LINK],
         )
     col1, col2, col3, col4, col5 = st.columns([0.3, 0.1, 0.1, 0.1, 0.4], gap="small")
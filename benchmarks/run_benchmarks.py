@@ -0,0 +1,301 @@
+"""
+PURPOSE:  Pricing throughput benchmarks with a JSON history for regression tracking
+
+Each benchmark runs in a fresh process so its peak RSS is its own. Results
+(wall time, peak RSS, items/second) are appended to benchmarks/history.json.
+Peak RSS covers the whole child process, input setup included; rss_growth_mb
+is how far the timed call alone raised the peak above the setup's. A
+benchmark that raises or exceeds BENCHMARK_TIMEOUT is reported as failed.
+
+    python -m benchmarks.run_benchmarks            # full suite
+    python -m benchmarks.run_benchmarks --quick    # small sizes only
+    python -m benchmarks.run_benchmarks -k aggregate
+
+CREATED:  2026/10/18
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from queue import Empty
+from typing import Callable, Dict, List, Tuple
+
+HISTORY = Path(__file__).parent / "history.json"
+
+# seconds a single benchmark (setup and timed call) may take
+BENCHMARK_TIMEOUT = 1800
+
+FREQUENCIES = ["Poisson", "NBinomial", "Zero-Inflated Poisson"]
+SEVERITIES = ["LogNormal", "Gamma"]
+
+
+def synthetic_policies(n: int, seed: int = 0) -> pd.DataFrame:
+    """D&O policies drawn from the codes in the rating tables"""
+    from src.components.pricing_demo import MetaData
+
+    rng = np.random.default_rng(seed)
+    pick = lambda table: rng.choice(list(table.keys()), n)
+    inception = pd.Timestamp("2023-01-01") + pd.to_timedelta(
+        rng.integers(0, 365, n), "D"
+    )
+    expiry = inception + pd.to_timedelta(rng.choice([365, 180, 548], n), "D")
+    return pd.DataFrame(
+        {
+            "y_o_a": 2023,
+            "limit": rng.choice([1e6, 5e6, 10e6, 25e6], n),
+            "other_commissions": 0.1,
+            "assets": rng.uniform(1e4, 1e7, n),
+            "country_id": pick(MetaData.DOMICILE_RATE),
+            "industry_id": pick(MetaData.INDUSTRY_RATE),
+            "listed_indicator_id": pick(MetaData.LISTING_RATE),
+            "cover_id": pick(MetaData.COVER_RATE),
+            "retro_option_id": pick(MetaData.RETRO_RATE),
+            "brokerage": rng.choice([0.1, 0.15, 0.2], n),
+            "excess": rng.choice([0, 1e6, 5e6], n),
+            "deductible": 0,
+            "inception_date": inception.strftime("%d/%m/%Y"),
+            "expiry_date": expiry.strftime("%d/%m/%Y"),
+            "adr_id": pick(MetaData.LISTINGADR_RATE),
+        }
+    )
+
+
+def synthetic_exposure(n_bands: int) -> pd.DataFrame:
+    """data/exposure.csv tiled (with jittered bands) up to n_bands rows"""
+    exposure = pd.read_csv("./data/exposure.csv")
+    reps = -(-n_bands // len(exposure))
+    scale = np.repeat(np.linspace(0.5, 1.5, reps), len(exposure))[:n_bands]
+    tiled = pd.concat([exposure] * reps, ignore_index=True).iloc[:n_bands]
+    for col in ["Lower", "Upper", "Premium"]:
+        tiled[col] = tiled[col] * scale
+    tiled["Code"] = np.arange(1, n_bands + 1)
+    return tiled
+
+
+def synthetic_lloyds(
+    n_syndicates: int = 100, years: Tuple[int, int] = (2012, 2022), seed: int = 0
+) -> pd.DataFrame:
+    """Long format frame with the lloyds.csv columns used by the Lloyd's pages"""
+    rng = np.random.default_rng(seed)
+    cobs = ["Property", "Casualty", "Marine", "Energy", "Reinsurance"]
+    grid = pd.MultiIndex.from_product(
+        [
+            [f"{1000 + i}" for i in range(n_syndicates)],
+            range(years[0], years[1] + 1),
+            cobs,
+        ],
+        names=["SyndicateCode", "Year", "LloydsGlobalCOB"],
+    ).to_frame(index=False)
+    grid["ManagingAgent"] = "Agent " + grid.SyndicateCode.str[-2:]
+    net = rng.lognormal(3.5, 1, len(grid))
+    frames = [
+        grid.assign(LineItem="Net", Amount=net),
+        grid.assign(LineItem="Gross", Amount=net * rng.uniform(1.1, 1.5, len(grid))),
+        grid.assign(
+            LineItem="Combined ratio", Amount=rng.lognormal(np.log(95), 0.15, len(grid))
+        ),
+    ]
+    return pd.concat(frames, ignore_index=True).assign(ActiveSyndicateFlag="Active")
+
+
+def bench_price_single(n: int) -> Callable:
+    from src.components.pricing_demo import RequestDOWW, get_price_doww
+
+    policies = synthetic_policies(n).to_dict("records")
+    return lambda: [get_price_doww(RequestDOWW(**policy)) for policy in policies]
+
+
+def bench_price_batch(n: int) -> Callable:
+    from src.components.pricing_demo import get_price_doww_batch
+
+    policies = synthetic_policies(n)
+    return lambda: get_price_doww_batch(policies)
+
+
+def bench_aggregate(n: int, frequency: str, severity: str) -> Callable:
+    from src.components.pricing_demo import aggregate_loss_model
+
+    return partial(
+        aggregate_loss_model,
+        severity,
+        frequency,
+        215000,
+        750000,
+        10,
+        4.6,
+        0.2,
+        1e5,
+        2.5e4,
+        n_sims=n,
+        ground_up=False,
+        seed=0,
+        use_cache=False,
+    )
+
+
+def bench_exposure_rating(n: int) -> Callable:
+    from src.components.exposure import ExposureRating
+
+    exposure = synthetic_exposure(n)
+    rating = ExposureRating(5.83, 0.484, exposure, 20e6, 20e6, exposure.Premium.sum())
+    return partial(
+        rating.exposure_rating, results=True, results_type="dict", verbose=False
+    )
+
+
+def bench_lloyds_model(n: int) -> Callable:
+    from src.components.lloyds_modelling import LloydsModel
+
+    model = LloydsModel(synthetic_lloyds(), "Property", start_year=2013, no_sims=n)
+    return partial(model.create_model, alpha=1, net=20)
+
+
+def benchmarks(quick: bool = False) -> Dict[str, Tuple[Callable, tuple, str]]:
+    """
+    name -> (setup function, args, unit). The setup function prepares the
+    inputs and returns the callable that is timed; args[0] is the item count.
+    """
+    sims = [1000, 100000] if quick else [1000, 100000, 1000000]
+    suite = {
+        "price_doww_single": (
+            bench_price_single,
+            (200 if quick else 2000,),
+            "policies",
+        ),
+        "price_doww_batch": (
+            bench_price_batch,
+            (10000 if quick else 200000,),
+            "policies",
+        ),
+        "exposure_rating": (
+            bench_exposure_rating,
+            (10000 if quick else 100000,),
+            "bands",
+        ),
+        "lloyds_create_model": (bench_lloyds_model, (10000,), "sims"),
+    }
+    for frequency in FREQUENCIES:
+        for severity in SEVERITIES:
+            for n in sims:
+                name = f"aggregate[{frequency}-{severity}-{n:.0e}]"
+                suite[name] = (bench_aggregate, (n, frequency, severity), "sims")
+    return suite
+
+
+def _peak_rss() -> int:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _measure(func: Callable, args: tuple, queue: multiprocessing.Queue) -> None:
+    try:
+        timed = func(*args)
+        baseline = _peak_rss()
+        start = time.perf_counter()
+        timed()
+        wall = time.perf_counter() - start
+        peak = _peak_rss()
+    except Exception as error:
+        queue.put({"error": f"{type(error).__name__}: {error}"})
+        return
+    queue.put(
+        {
+            "wall_seconds": wall,
+            "peak_rss_mb": peak / 2**20,
+            "rss_growth_mb": (peak - baseline) / 2**20,
+            "items": args[0],
+        }
+    )
+
+
+def run(name: str, func: Callable, args: tuple, unit: str) -> Dict:
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_measure, args=(func, args, queue))
+    process.start()
+    deadline = time.monotonic() + BENCHMARK_TIMEOUT
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1)
+        except Empty:
+            if not process.is_alive():
+                # the child died without reporting (e.g. killed for memory)
+                try:
+                    result = queue.get(timeout=1)
+                except Empty:
+                    result = {"error": f"exited with code {process.exitcode}"}
+            elif time.monotonic() > deadline:
+                process.terminate()
+                result = {"error": f"timed out after {BENCHMARK_TIMEOUT}s"}
+    process.join()
+    result["name"] = name
+    result["unit"] = unit
+    if "error" not in result:
+        result[f"{unit}_per_second"] = result["items"] / result["wall_seconds"]
+    return result
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": multiprocessing.cpu_count(),
+    }
+
+
+def record(results: List[Dict], history: Path = HISTORY) -> None:
+    runs = json.loads(history.read_text()) if history.exists() else []
+    runs.append({**environment(), "results": results})
+    history.write_text(json.dumps(runs, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--quick", action="store_true", help="small sizes only")
+    parser.add_argument("-k", default="", help="only run names containing this")
+    parser.add_argument("--no-record", action="store_true", help="skip history.json")
+    options = parser.parse_args()
+
+    results = []
+    for name, (func, args, unit) in benchmarks(options.quick).items():
+        if options.k not in name:
+            continue
+        result = run(name, func, args, unit)
+        results.append(result)
+        if "error" in result:
+            print(f"{name:<48} FAILED {result['error']}")
+            continue
+        print(
+            f"{name:<48} {result['wall_seconds']:>9.3f}s "
+            f"{result['peak_rss_mb']:>8.0f}MB "
+            f"(+{result['rss_growth_mb']:.0f}MB) "
+            f"{result[f'{unit}_per_second']:>14,.0f} {unit}/s"
+        )
+    if not options.no_record:
+        record(results)
+
+
+if __name__ == "__main__":
+    main()
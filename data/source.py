@@ -1,13 +1,37 @@
+import os
 import sqlite3
 import logging
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from pathlib import Path
 from datetime import date
 from dataclasses import dataclass
+from typing import List, Optional
+from src.utils.search import ArticleSearch
+from src.utils.table_cache import SQLiteTableCache
 
 logging.getLogger().setLevel(logging.INFO)
 
+DATABASE = "./data/Database.sqlite"
+SEARCH_INDEX = "./data/.cache/search.sqlite"
+LLOYDS_CSV = "./data/lloyds.csv"
+LLOYDS_CACHE = "./data/.cache"
+LLOYDS_DTYPES = {"Year": "int16", "Amount": "float32"}
+LLOYDS_CATEGORIES = [
+    "ManagingAgent",
+    "SyndicateCode",
+    "LloydsGlobalCOB",
+    "LineItem",
+    "ActiveSyndicateFlag",
+]
+
+
+# tidied article tables, shared by every session of the process
+article_cache = SQLiteTableCache(DATABASE)
+article_search = ArticleSearch(DATABASE, SEARCH_INDEX)
+
 
 @dataclass
 class DataSchema:
@@ -20,29 +44,93 @@ class DataSchema:
     SEARCH: str = "TextSearch"
     CODE: str = "SyndicateCode"
     AGENT: str = "ManagingAgent"
+    ROWID: str = "RowId"
 
 
 class DataSource:
-    # @st.cache_data(ttl=5000)
     def load_data(self, table: str = "market_articles") -> pd.DataFrame:
         """
-        Function to extract data from sqlite db and produce a dataframe
+        Function to extract data from sqlite db and produce a dataframe.
+        The tidied frame is shared by every session and rerun, rebuilt only
+        when the table changes and extended with just the new rows when
+        articles are appended (see SQLiteTableCache).
+        """
+
+        def load(conn: sqlite3.Connection, after: int, upto: int) -> pd.DataFrame:
+            query = f"""
+            SELECT rowid AS {DataSchema.ROWID}, * FROM {table}
+            WHERE Date >= "2020-01-01" AND rowid > ? AND rowid <= ?
+            ORDER BY Date DESC
+            """
+            return self.tidy_data(pd.read_sql(query, conn, params=(after, upto)))
+
+        return article_cache.get(
+            table, load, sort_by=[DataSchema.DATE], ascending=False
+        )
+
+    def search_articles(
+        self,
+        search: str,
+        table: str = "market_articles",
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        RowIds of the articles in table matching a search box string, from the
+        table's full-text index (see ArticleSearch and fts_query). None when the
+        search is empty, i.e. no filter.
         """
-        logging.info("loading data")
-        conn = sqlite3.connect("./data/Database.sqlite")
+        return article_search.search(table, search, start_date, end_date)
 
-        query = f"""
-        SELECT * FROM {table}
-        WHERE Date >= "2020-01-01"
-        ORDER BY Date DESC
+    def lloyds_parquet(self) -> Path:
+        """
+        Typed parquet copy of lloyds.csv, converted once per csv version (mtime
+        and size) and sorted by COB and Year so row groups can be skipped
         """
-        logging.info("data loaded")
+        stat = os.stat(LLOYDS_CSV)
+        path = Path(LLOYDS_CACHE) / f"lloyds-{stat.st_mtime_ns}-{stat.st_size}.parquet"
+        if not path.exists():
+            logging.info("converting lloyds.csv to parquet")
+            lloyds = (
+                pd.read_csv(LLOYDS_CSV, dtype=LLOYDS_DTYPES)
+                .astype({col: "category" for col in LLOYDS_CATEGORIES})
+                .sort_values(["LloydsGlobalCOB", "Year"], kind="stable")
+            )
+            path.parent.mkdir(parents=True, exist_ok=True)
+            for stale in path.parent.glob("lloyds-[0-9]*.parquet"):
+                stale.unlink()
+            lloyds.to_parquet(path, index=False, row_group_size=100000)
+        return path
+
+    def load_lloyds(
+        self,
+        columns: Optional[List[str]] = None,
+        cobs: Optional[List[str]] = None,
+        min_year: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Active syndicate rows of lloyds.csv, read from its typed parquet copy
 
-        return self.tidy_data(pd.read_sql(query, conn))
+        params:
+            columns: only read these columns
+            cobs: only rows for these LloydsGlobalCOB values
+            min_year: only rows from this Year on
 
-    def load_lloyds(self) -> pd.DataFrame:
-        lloyds = pd.read_csv("./data/lloyds.csv")
-        lloyds = lloyds[(lloyds.ActiveSyndicateFlag == "Active")].reset_index(drop=True)
+        returns:
+            dataframe with categorical codes, int16 Year and float32 Amount
+        """
+        filters = [("ActiveSyndicateFlag", "==", "Active")]
+        if cobs is not None:
+            filters.append(("LloydsGlobalCOB", "in", list(cobs)))
+        if min_year is not None:
+            filters.append(("Year", ">=", min_year))
+        lloyds = pd.read_parquet(
+            self.lloyds_parquet(), columns=columns, filters=filters
+        )
+        # parquet keeps string categoricals but not numeric ones (SyndicateCode)
+        lloyds = lloyds.astype(
+            {col: "category" for col in LLOYDS_CATEGORIES if col in lloyds}
+        )
 
         return lloyds
 
@@ -50,42 +138,40 @@ class DataSource:
         return pd.read_csv("./data/exposure.csv")
 
     def lloyds_syndicate_dict(self) -> dict:
-        lloyds = self.load_lloyds()
-        df = (
-            lloyds[[DataSchema.AGENT, DataSchema.CODE]]
-            .drop_duplicates()
-            .reset_index(drop=True)
-        )
+        lloyds = self.load_lloyds(columns=[DataSchema.AGENT, DataSchema.CODE])
+        df = lloyds.drop_duplicates().reset_index(drop=True)
 
         return dict(zip(df[DataSchema.CODE], df[DataSchema.AGENT]))
 
     def make_markdown(self, title: str, link: str) -> str:
-        markdown = "[{}]({})".format(title, link)
-        return markdown
+        """[title](link), for single values or elementwise over Series"""
+        return "[" + title + "](" + link + ")"
 
-    def date_formatter(self, date: date) -> str:
-        if date.month < 10:
-            new_date = str(date.year) + "-" + "0" + str(date.month)
-
-        else:
-            new_date = str(date.year) + "-" + str(date.month)
-
-        return new_date
+    def parse_dates(self, dates: pd.Series) -> pd.Series:
+        """
+        Article timestamps as naive UTC datetime64. ISO 8601 strings take the
+        fixed-format parser; anything else falls back to per-element inference.
+        """
+        try:
+            parsed = pd.to_datetime(dates, format="ISO8601", utc=True)
+        except (ValueError, TypeError):
+            parsed = pd.to_datetime(dates, format="mixed", utc=True)
+        return parsed.dt.tz_localize(None)
 
     def tidy_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        df = df.rename(columns={"Description": DataSchema.SUMMARY})
+        df[DataSchema.DATE] = self.parse_dates(df[DataSchema.DATE])
         df = df.sort_values(DataSchema.DATE, ascending=False).reset_index(drop=True)
-        df.rename(columns={"Description": DataSchema.SUMMARY}, inplace=True)
-        df[DataSchema.DATE] = pd.to_datetime(
-            df[DataSchema.DATE], format="mixed", utc=True
-        ).dt.date
+        # Date is kept as datetime64 (day precision) so filters stay vectorized
+        df[DataSchema.DATE] = df[DataSchema.DATE].dt.normalize()
         df[DataSchema.SEARCH] = (
             df[DataSchema.TITLE].str.lower() + df[DataSchema.SUMMARY].str.lower()
         )
         df[DataSchema.MAIN] = df[DataSchema.TITLE]
-        df[DataSchema.TITLE] = df.apply(
-            lambda x: self.make_markdown(x.Title, x.Link), axis=1
+        df[DataSchema.TITLE] = self.make_markdown(
+            df[DataSchema.TITLE], df[DataSchema.LINK]
         )
-        df[DataSchema.YMDATE] = df[DataSchema.DATE].apply(self.date_formatter)
+        df[DataSchema.YMDATE] = df[DataSchema.DATE].dt.to_period("M").astype(str)
         try:
             df = df.drop(["neg", "pos", "neu"], axis=1)
         except:
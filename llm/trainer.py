@@ -1,7 +1,7 @@
 import logging
-import datetime
 import openai
 import os
+import pandas as pd
 from typing import Mapping, Any
 
 from langchain import HuggingFaceHub
@@ -46,7 +46,7 @@ class LLMIns(DataSource, DataSchema):
 
         dataset = (
             data[
-                (data[self.DATE] > datetime.date(year=2023, month=1, day=1))
+                (data[self.DATE] > pd.Timestamp(year=2023, month=1, day=1))
                 & (data.Title.str.contains("insuranceinsider"))
             ]
             .reset_index(drop=True)[[self.SUMMARY]]
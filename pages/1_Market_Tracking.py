@@ -1,4 +1,5 @@
 import streamlit as st
+import pandas as pd
 import datetime
 
 from data.source import source, DataSchema
@@ -27,10 +28,12 @@ start_date = st.sidebar.date_input(
 end_date = st.sidebar.date_input("End date", datetime.date.today())
 
 # Data filtering ----
+rowids = source.search_articles(search)
+if rowids is not None:
+    df = df[df[DataSchema.ROWID].isin(rowids)]
 df = df[
-    (df[DataSchema.SEARCH].str.contains(search.lower()))
-    & (df[DataSchema.DATE] >= start_date)
-    & (df[DataSchema.DATE] <= end_date)
+    (df[DataSchema.DATE] >= pd.Timestamp(start_date))
+    & (df[DataSchema.DATE] <= pd.Timestamp(end_date))
 ].reset_index(drop=True)
 articles = df.shape[0]
 sentiment = "Positive" if df.compound.sum() >= 0 else "Negative"
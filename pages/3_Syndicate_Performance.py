@@ -26,6 +26,7 @@ cob = st.sidebar.selectbox(
         "Reinsurance",
         "Aviation",
         "Motor",
+        "All",
     ),
 )
 
@@ -52,7 +53,7 @@ tab1, tab2, tab3, tab4 = st.tabs(
 
 with st.spinner("Loading Modelling..."):
     # Model ----
-    model = LloydsModel(lloyds, cob, start_year=2022 - timeframe)
+    model = LloydsModel(lloyds, cob, start_year=2022 - timeframe, seed=42)
 
     # Chart ----
     with tab1:
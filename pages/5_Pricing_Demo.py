@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import datetime
 
 from src.utils.utils import utils
@@ -8,11 +7,17 @@ from data.source import source
 from src.components.pricing_demo import (
     get_price_doww,
     aggregate_loss_model,
+    aggregate_loss_stream,
+    aggregate_loss_distribution,
     aggregate_table,
     confidence_interval,
+    value_at_risk,
+    spread_value_at_risk,
+    tail_value_at_risk,
     aggregate_chart,
     frequency_chart,
     severity_chart,
+    simulation_cache,
     RequestDOWW,
     MetaData,
 )
@@ -187,6 +192,15 @@ with tab3:
     )
     agg_form.divider()
     rp = agg_form.slider("@ Risk Return Period:", 1, 1000, 250)
+    engine = agg_form.radio(
+        "Engine:", ["Monte Carlo", "FFT (no simulation)"], horizontal=True
+    )
+    n_sims = agg_form.select_slider(
+        "Number of Simulations:",
+        options=[1000, 10000, 100000, 1000000, 10000000],
+        value=1000,
+    )
+    seed = agg_form.number_input("Random Seed:", min_value=0, value=42, step=1)
     agg_form.divider()
     limit2 = agg_form.number_input(
         "Select Limit ($USD):",
@@ -229,8 +243,11 @@ with tab3:
     agg_submitted = agg_form.form_submit_button("Submit")
 
 if agg_submitted:
-    n_sims = 1000
-    sim_losses = aggregate_loss_model(
+    # Large runs are streamed into running statistics with a fixed memory ceiling
+    simulate = aggregate_loss_model if n_sims <= 100000 else aggregate_loss_stream
+    if engine != "Monte Carlo":
+        simulate = aggregate_loss_distribution
+    sim_losses = simulate(
         severity,
         frequency,
         sev_mean,
@@ -244,19 +261,21 @@ if agg_submitted:
         aal,
         n_sims,
         not ground_up,
+        seed=seed,
     )
     ci = confidence_interval(sim_losses, 0.95)
     up_down = aggregate_table(sim_losses)
+    mean_loss, std_loss = sim_losses.mean(), sim_losses.std()
     agg_results.markdown(
         f"""
         Agg Model Results
         {"-"*60}
-        - Mean Agg loss: &#36;{np.mean(sim_losses):,.0f} with 95% CI: &#36;{ci[0]:,.0f}, &#36;{ci[1]:,.0f}
-        - Std Agg loss: ${np.std(sim_losses):,.0f}
-        - CoV: {(np.std(sim_losses)/np.mean(sim_losses))*100:.0f}%
-        - VaR @1-in-{rp}: ${np.mean(sim_losses[int(n_sims/rp)]):,.0f}
-        - SVaR @1-in-{rp}+/-25: ${np.mean(sim_losses[int(n_sims/(rp + 25)):int(n_sims/(rp-25))]):,.0f}
-        - TVaR @1-in-{rp}: ${np.mean(sim_losses[:int(n_sims/rp)]):,.0f}
+        - Mean Agg loss: &#36;{mean_loss:,.0f} with 95% CI: &#36;{ci[0]:,.0f}, &#36;{ci[1]:,.0f}
+        - Std Agg loss: ${std_loss:,.0f}
+        - CoV: {(std_loss/mean_loss)*100:.0f}%
+        - VaR @1-in-{rp}: ${value_at_risk(sim_losses, rp):,.0f}
+        - SVaR @1-in-{rp}+/-25: ${spread_value_at_risk(sim_losses, rp):,.0f}
+        - TVaR @1-in-{rp}: ${tail_value_at_risk(sim_losses, rp):,.0f}
         """
     )
     agg_table.dataframe(
@@ -264,6 +283,10 @@ if agg_submitted:
         hide_index=True,
         use_container_width=True,
     )
+    cache_stats = simulation_cache.stats()
+    col_b.caption(
+        f"Simulation cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses"
+    )
     # agg_table.dataframe(
     #     up_down.style.applymap(utils.highlight_column, subset=["Percentile"]),
     #     hide_index=True,
@@ -358,3 +381,14 @@ with tab4:
         exposure_rating.plot_exposure_curve(),
         use_container_width=True,
     )
+    if col_ii.checkbox("Simulate layer losses from the exposure curve"):
+        exposure_losses = exposure_rating.simulate(n_sims=10000, seed=42)
+        col_ii.dataframe(
+            aggregate_table(exposure_losses),
+            hide_index=True,
+            use_container_width=True,
+        )
+        col_ii.plotly_chart(
+            aggregate_chart(exposure_losses, 250, 10000),
+            use_container_width=True,
+        )
@@ -51,11 +51,16 @@ def plot_article_sentiments(df: DataFrame, percentage: bool = True) -> px.bar:
         return {}
 
 
-def plot_major_loss_trend(df: DataFrame, loss_search: str = "Ian") -> go.Figure:
+def plot_major_loss_trend(
+    df: DataFrame, loss_search: str = "Ian", matched: Series = None
+) -> go.Figure:
     ave_ml = int(
         round(df.groupby(["YearMonth"]).agg({"Title": Series.nunique}).Title.mean(), 0)
     )
-    if len(loss_search) > 0:
+    # matched: rows found by source.search_articles, else scan the text
+    if matched is not None:
+        df_search = df[~matched]
+    elif len(loss_search) > 0:
         df_search = df[
             ~(df.Title.str.contains(loss_search))
             & ~(df.Summary.str.contains(loss_search))
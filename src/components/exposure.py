@@ -3,6 +3,7 @@ import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import scipy.stats as stats
+import scipy.integrate as integrate
 
 
 from dataclasses import dataclass
@@ -11,24 +12,84 @@ from src.utils.utils import utils
 
 class ExposureSeverity(stats.rv_continuous):
     """
-    Class function to convert bernegger cdf into pdf and rvs functions.
+    Damage ratio distribution implied by the bernegger exposure curve.
     cdf is: F(x) = { 1- G'(x)/G'(0), 1 for 0<= x < 1, x = 1
+    so there is a point mass of 1/g at a total loss (x = 1).
+
+    Equation from PIGI, page 415 (eq. 22.17): with A = b(g - 1), B = 1 - bg
+    F(x) = A(1 - b^x) / (A + B b^x) for x < 1, and F(x) = 1 - 1/(1 + (g - 1)x)
+    in the b = 1 limit. cdf, pdf and ppf are closed form over arrays and rvs
+    samples by inverting uniforms.
     """
 
     def __init__(self, xtol=1e-14, seed=None):
-        super().__init__(a=0, xtol=xtol, seed=seed)
+        super().__init__(a=0, b=1, xtol=xtol, seed=seed, name="exposure_severity")
+
+    @staticmethod
+    def _terms(b, g):
+        return b * (g - 1), 1 - b * g
 
     def _cdf(self, x, b, g):
-        if x[0] >= 1:
-            return 1
-        else:
-            """
-            Equation from PIGI, page 415 (eq. 22.17)
-            Assumes c=4 to calculate bernegger params b, g
-            """
-            return (b * (g - 1) * (1 - (b**x))) / (
-                (b * (g - 1)) + ((1 - b * g) * b**x)
+        A, B = self._terms(b, g)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cdf = np.where(
+                np.isclose(b, 1),
+                1 - 1 / (1 + (g - 1) * x),
+                A * (1 - b**x) / (A + B * b**x),
+            )
+        return np.where(x >= 1, 1.0, np.nan_to_num(cdf))
+
+    def _pdf(self, x, b, g):
+        # density of the continuous part below 1, the total loss mass is excluded
+        A, B = self._terms(b, g)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pdf = np.where(
+                np.isclose(b, 1),
+                (g - 1) / (1 + (g - 1) * x) ** 2,
+                -A * (1 - b) * np.log(b) * b**x / (A + B * b**x) ** 2,
+            )
+        return np.where(x >= 1, 0.0, np.nan_to_num(pdf))
+
+    def _ppf(self, q, b, g):
+        A, B = self._terms(b, g)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = np.where(
+                np.isclose(b, 1),
+                q / ((1 - q) * (g - 1)),
+                np.log(A * (1 - q) / (A + q * B)) / np.log(b),
             )
+        # quantiles inside the point mass are a total loss
+        return np.where(q >= 1 - 1 / g, 1.0, np.clip(np.nan_to_num(x), 0, 1))
+
+    def _rvs(self, b, g, size=None, random_state=None):
+        return self._ppf(random_state.random(size), b, g)
+
+    def _munp(self, n, b, g):
+        # E[X^n] = int_0^1 n x^(n - 1) (1 - F(x)) dx, which includes the mass at 1
+        moment = lambda b, g: integrate.quad(
+            lambda x: n * x ** (n - 1) * (1 - self._cdf(x, b, g)), 0, 1
+        )[0]
+        return np.vectorize(moment)(b, g)
+
+
+def bernegger_curve(x: np.ndarray, b: float, g: float) -> np.ndarray:
+    """
+    Bernegger exposure curve G(x) evaluated over an array of x, with G = 1 for
+    x >= 1. Reference PIGI page 414 (eq. 22.16) for b > 0, b != 1, bg != 1 and
+    g > 1, plus the limiting forms for g = 1 (or b = 0), b = 1 and bg = 1.
+    """
+    x = np.minimum(np.asarray(x, dtype=float), 1)
+    if g == 1 or b == 0:
+        return x
+    if np.isclose(b, 1):
+        return np.log(1 + (g - 1) * x) / np.log(g)
+    if np.isclose(b * g, 1):
+        return (1 - b**x) / (1 - b)
+    return np.log(((g - 1) * b + (1 - b * g) * b**x) / (1 - b)) / np.log(b * g)
+
+
+# Expected number of layer claims drawn at once by ExposureRating.simulate
+EXPOSURE_CLAIMS_PER_CHUNK = 2_000_000
 
 
 @dataclass
@@ -47,19 +108,12 @@ class ExposureRating:
             np.log(self.b) * (1 - self.b * self.g)
         )
 
-    def bernegger(self, x: float) -> float:
+    def bernegger(self, x: np.ndarray) -> np.ndarray:
         """
-        Bernegger curve for b > 0, b != 1, bg != 1 and g > 1.
-        Refer to PIGI for alternative forms if conditions breach the criteria above.
+        Bernegger curve for this risk's b and g, see bernegger_curve.
         Reference page 414 (eq. 22.16)
         """
-        if x > 1:
-            return 1.0
-        else:
-            return np.log(
-                ((self.g - 1) * self.b + (1 - self.b * self.g) * self.b**x)
-                / (1 - self.b)
-            ) / np.log(self.b * self.g)
+        return bernegger_curve(x, self.b, self.g)
 
     def exposure_rating(
         self, results: bool = False, results_type: str = "dict", verbose: bool = True
@@ -81,9 +135,9 @@ class ExposureRating:
             / exposure.Share
         )
 
-        exposure["G(d)"] = utils.vectorize(self.bernegger, exposure["d"])
-        exposure["G(d+l)"] = utils.vectorize(self.bernegger, exposure["d + l"])
-        exposure["G(d+1)"] = utils.vectorize(self.bernegger, exposure["d + 1"])
+        exposure["G(d)"] = self.bernegger(exposure["d"])
+        exposure["G(d+l)"] = self.bernegger(exposure["d + l"])
+        exposure["G(d+1)"] = self.bernegger(exposure["d + 1"])
 
         exposure["claim_pct"] = exposure["G(d+l)"] - exposure["G(d)"]
         exposure["claim_freq_pct"] = exposure["G(d+1)"] - exposure["G(d)"]
@@ -113,6 +167,116 @@ class ExposureRating:
                 case _:
                     print("unspecified type. Please select dict or dataframe")
 
+    def layer_grid(self, attachments: np.ndarray, limits: np.ndarray) -> pd.DataFrame:
+        """
+        Exposure rate a tower of layers against the same risk profile in one pass,
+        evaluating the curve over a bands x layers grid.
+
+        params:
+            attachments: layer attachments
+            limits: layer limits, broadcast against attachments
+
+        returns:
+            one row per layer with loss cost, claim frequency and rate on line
+        """
+        attachments, limits = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(attachments, dtype=float)),
+            np.atleast_1d(np.asarray(limits, dtype=float)),
+        )
+        exposure = self._exposure
+        # sum insured share of each band, as a column against the layer row
+        insured = (
+            ((exposure.Upper + exposure.Lower) / 2 * exposure.Share)
+            .to_numpy(dtype=float)
+            .reshape(-1, 1)
+        )
+        expected_loss = (
+            exposure.Premium.to_numpy(dtype=float) * self.selected_loss_ratio
+        )
+
+        g_d = self.bernegger(attachments / insured)
+        claim_pct = self.bernegger((attachments + limits) / insured) - g_d
+        claim_freq_pct = self.bernegger((attachments + 1) / insured) - g_d
+
+        loss_cost = expected_loss @ claim_pct
+        return pd.DataFrame(
+            {
+                "attachment": attachments,
+                "limit": limits,
+                "loss_cost": loss_cost,
+                "frequency": expected_loss @ claim_freq_pct,
+                "rate_on_line": loss_cost / limits,
+            }
+        )
+
+    def simulate(
+        self,
+        n_sims: int = 10000,
+        aad: float = 0,
+        aal: float = 0,
+        chunk_size: int = None,
+        seed: int = None,
+    ) -> np.ndarray:
+        """
+        Annual layer losses simulated from the exposure curve. Each band has a
+        Poisson claim rate set so that rate x (sum insured x share) x mean damage
+        ratio equals its expected loss, and claim damage ratios are drawn from
+        ExposureSeverity. Only claims that exceed the attachment are simulated
+        (a thinned Poisson process), so ground-up claims are never materialised.
+
+        params:
+            n_sims: number of simulated years
+            aad, aal: annual aggregate deductible and limit (0 for no aal)
+            chunk_size: years simulated at a time, by default enough for about
+                EXPOSURE_CLAIMS_PER_CHUNK layer claims
+            seed: entropy for the SeedSequence the chunk streams are spawned from
+
+        returns:
+            annual losses sorted largest first
+        """
+        exposure = self._exposure
+        insured = ((exposure.Upper + exposure.Lower) / 2 * exposure.Share).to_numpy(
+            dtype=float
+        )
+        expected_loss = (
+            exposure.Premium.to_numpy(dtype=float) * self.selected_loss_ratio
+        )
+        severity = ExposureSeverity()
+
+        # rate of claims whose damage ratio exceeds the attachment, per band
+        cdf_d = severity.cdf(self.attachment / insured, self.b, self.g)
+        rate = expected_loss / (insured * self.mean_damage_ratio) * (1 - cdf_d)
+        total_rate = rate.sum()
+        losses = np.zeros(int(n_sims))
+        if total_rate <= 0:
+            return losses
+        band_cdf = np.cumsum(rate) / total_rate
+
+        chunk_size = int(
+            chunk_size or max(1, EXPOSURE_CLAIMS_PER_CHUNK // max(total_rate, 1))
+        )
+        starts = range(0, int(n_sims), chunk_size)
+        seeds = np.random.SeedSequence(seed).spawn(len(starts))
+        for start, chunk_seed in zip(starts, seeds):
+            rng = np.random.default_rng(chunk_seed)
+            counts = rng.poisson(total_rate, min(chunk_size, int(n_sims) - start))
+            bands = np.minimum(
+                np.searchsorted(band_cdf, rng.random(counts.sum()), side="right"),
+                insured.size - 1,
+            )
+            # damage ratio conditional on exceeding the attachment, calling _ppf
+            # with scalar b, g rather than broadcasting them to every claim
+            u = cdf_d[bands] + rng.random(bands.size) * (1 - cdf_d[bands])
+            claims = severity._ppf(u, self.b, self.g) * insured[bands]
+            claims -= self.attachment
+            np.clip(claims, 0, self.limit, out=claims)
+            losses[start : start + counts.size] = utils.segment_sum(claims, counts)
+
+        losses = np.maximum(losses - aad, 0)
+        if aal > 0:
+            losses = np.minimum(losses, aal)
+        return np.sort(losses)[::-1]
+
     def plot_exposure_curve(self) -> go.Figure:
         fig = make_subplots(specs=[[{"secondary_y": True}]])
         x = np.arange(0, 1.01, 0.01)
@@ -122,7 +286,7 @@ class ExposureRating:
                 name="Exposure Curve",
                 mode="lines",
                 x=x,
-                y=utils.vectorize(self.bernegger, x),
+                y=self.bernegger(x),
                 line_color="#FF3333",
             )
         )
@@ -50,6 +50,7 @@ def draw_aggrid(df) -> AgGrid:
     gb.configure_column("YearMonth", hide=True)
     gb.configure_column("Main", hide=True)
     gb.configure_column("Link", hide=True)
+    gb.configure_column("RowId", hide=True)
     # gb.configure_default_column(floatingFilter=True)
     gridOptions = gb.build()
 
@@ -0,0 +1,156 @@
+"""
+PURPOSE:  Per-COB syndicate-year cube shared by the Lloyd's charts and model
+
+CREATED:  2026/10/18
+"""
+
+import numpy as np
+import pandas as pd
+
+from typing import List, Optional, Tuple
+from src.utils.cache import LRUCache
+from src.utils import aggregations as agg
+
+KEYS = ["ManagingAgent", "SyndicateCode", "Year"]
+DIMENSIONS = ["LloydsGlobalCOB", "ManagingAgent", "SyndicateCode", "Year", "LineItem"]
+
+# pseudo COB combining every COB, and the line items it carries
+ALL_COB = "All"
+ALL_COB_LINE_ITEMS = ["Combined ratio", "Gross", "Net"]
+
+# cube per distinct lloyds frame content, shared by every session
+cube_cache = LRUCache(max_bytes=128 * 2**20)
+
+
+def fingerprint(lloyds: pd.DataFrame) -> Tuple:
+    """
+    Identity of a lloyds frame's content: its columns, row count and a hash of
+    its values. Filtered or edited frames get a different fingerprint.
+    """
+    values = pd.util.hash_pandas_object(lloyds, index=False)
+    return (tuple(lloyds.columns), len(lloyds), int(values.sum()))
+
+
+class LloydsCube:
+    """
+    Active, positive lloyds.csv amounts aggregated once to
+    COB x (ManagingAgent, SyndicateCode) x Year x LineItem, holding the sum and
+    count of Amount per cell. Dimensions are categoricals and every COB's slice
+    is kept sorted by Year, so a chart's data prep is an index slice plus a
+    pivot.
+
+    params:
+        data: long frame with the DIMENSIONS columns, Amount (sum) and Count
+    """
+
+    def __init__(self, data: pd.DataFrame) -> None:
+        self.data = data
+        self.max_year = int(data.Year.max()) if len(data) else None
+        self._by_cob = {
+            cob: frame.drop(columns="LloydsGlobalCOB").reset_index(drop=True)
+            for cob, frame in data.groupby("LloydsGlobalCOB", observed=True)
+        }
+
+    @classmethod
+    def from_frame(cls, lloyds: pd.DataFrame) -> "LloydsCube":
+        df = lloyds[(lloyds.ActiveSyndicateFlag == "Active") & (lloyds.Amount > 0)]
+        data = (
+            df.astype(
+                {
+                    **{col: "category" for col in DIMENSIONS if col != "Year"},
+                    "Year": "int64",
+                    "Amount": "float64",
+                }
+            )
+            .groupby(DIMENSIONS, observed=True)
+            .Amount.agg(Amount="sum", Count="count")
+            .reset_index()
+            .sort_values(["LloydsGlobalCOB", "Year"], kind="stable")
+            .reset_index(drop=True)
+        )
+        return cls(data)
+
+    @classmethod
+    def of(cls, lloyds: pd.DataFrame) -> "LloydsCube":
+        """
+        Cube for a lloyds frame, built once per distinct content (see
+        fingerprint), so the loaded frame and any frame derived from it each
+        get a cube of their own rows
+        """
+        return cube_cache.get_or_compute(
+            LRUCache.make_key(fingerprint(lloyds)), lambda: cls.from_frame(lloyds)
+        )
+
+    @property
+    def cobs(self) -> List[str]:
+        return list(self._by_cob)
+
+    def select(
+        self,
+        cob: str,
+        min_year: Optional[int] = None,
+        line_items: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Cells of one COB from min_year on, optionally for some line items"""
+        frame = self._by_cob.get(cob)
+        if frame is None:
+            frame = self.data.iloc[:0].drop(columns="LloydsGlobalCOB")
+        if min_year is not None:
+            frame = frame.iloc[frame.Year.searchsorted(min_year) :]
+        if line_items is not None:
+            frame = frame[frame.LineItem.isin(line_items)]
+        # plain dtypes for the callers' own groupbys and comparisons
+        return frame.astype(
+            {
+                col: frame[col].cat.categories.dtype
+                for col in ["ManagingAgent", "SyndicateCode", "LineItem"]
+            }
+        )
+
+    def pivot(
+        self,
+        cob: str,
+        min_year: Optional[int] = None,
+        line_items: Optional[List[str]] = None,
+        how: str = "sum",
+    ) -> pd.DataFrame:
+        """
+        One row per syndicate year with a column per line item, the sum (or
+        mean, for how="mean") of Amount in each cell. See combined for ALL_COB.
+        """
+        if cob == ALL_COB:
+            return self.combined(min_year, line_items, how)
+        df = self.select(cob, min_year, line_items)
+        if how == "mean":
+            df = df.assign(Amount=df.Amount / df.Count)
+        return df.pivot(index=KEYS, columns="LineItem", values="Amount").reset_index()
+
+    def combined(
+        self,
+        min_year: Optional[int] = None,
+        line_items: Optional[List[str]] = None,
+        how: str = "sum",
+    ) -> pd.DataFrame:
+        """
+        pivot over every COB at once: Net and Gross are summed across COBs and
+        the combined ratio is the Net-weighted mean of the COB combined ratios.
+        Only ALL_COB_LINE_ITEMS are available.
+        """
+        wide = pd.concat(
+            [self.pivot(cob, min_year, ALL_COB_LINE_ITEMS, how) for cob in self.cobs],
+            ignore_index=True,
+        ).reindex(columns=KEYS + ALL_COB_LINE_ITEMS)
+        rated = wide.dropna(subset=["Combined ratio", "Net"])
+        df = pd.DataFrame(
+            {
+                "Combined ratio": agg.weighted_mean(
+                    rated, KEYS, "Combined ratio", "Net", empty=np.nan
+                ),
+                "Gross": agg.total(wide, KEYS, "Gross"),
+                "Net": agg.total(wide, KEYS, "Net"),
+            }
+        )
+        if line_items is not None:
+            df = df[[item for item in ALL_COB_LINE_ITEMS if item in line_items]]
+        df.columns.name = "LineItem"
+        return df.reset_index()
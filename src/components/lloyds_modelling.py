@@ -1,5 +1,9 @@
 from src.utils.copula import Copula
-from functools import lru_cache
+from src.components.lloyds_cube import LloydsCube, fingerprint
+from src.utils.cache import LRUCache
+from src.utils.utils import utils
+from src.utils import aggregations as agg
+from typing import Callable, Optional
 import pandas as pd
 import numpy as np
 import seaborn as sns
@@ -8,55 +12,85 @@ import matplotlib.patches as mpatches
 import plotly.express as px
 
 
+# Shared by every session of the app, so reruns and switching COB reuse results
+model_cache = LRUCache(max_bytes=256 * 2**20)
+
+
 class LloydsModel(Copula):
     def __init__(
-        self, lloyds: pd.DataFrame, lloyds_cob: str, start_year: int = 2012
+        self,
+        lloyds: pd.DataFrame,
+        lloyds_cob: str,
+        start_year: int = 2012,
+        no_sims: int = 10000,
+        seed: Optional[int] = None,
     ) -> None:
         super().__init__()
         self._lloyds = lloyds
         self.lloyds_cob = lloyds_cob
         self.start_year = start_year
-        self.no_sims = 10000
+        self.no_sims = no_sims
+        self.seed = seed
         self.weight_dict = self.create_default_weight()
+        self.data_version = fingerprint(lloyds)
+
+    def _cached(self, name: str, compute: Callable, *args) -> pd.DataFrame:
+        """
+        Look up a result in model_cache, keyed on everything it depends on:
+        COB, start year, year weights, the data's fingerprint and the call's
+        arguments
+        """
+        key = LRUCache.make_key(
+            name,
+            self.lloyds_cob,
+            self.start_year,
+            tuple(sorted(self.weight_dict.items())),
+            self.data_version,
+            *args,
+        )
+        return model_cache.get_or_compute(key, compute).copy()
 
-    @lru_cache(maxsize=1)
     def create_syndicate_year_df(self) -> pd.DataFrame:
-        syndicate_results = (
-            self._lloyds[
-                (self._lloyds["LloydsGlobalCOB"] == self.lloyds_cob)
-                & (self._lloyds.Year >= self.start_year)
-                & (self._lloyds.ActiveSyndicateFlag == "Active")
-                & (self._lloyds.LineItem.isin(["Combined ratio", "Net"]))
-                & (self._lloyds.Amount > 0)
-            ]
-            .groupby(["ManagingAgent", "SyndicateCode", "Year", "LineItem"])
-            .agg({"Amount": sum})
-            .reset_index()
-            .pivot(
-                index=["ManagingAgent", "SyndicateCode", "Year"],
-                columns="LineItem",
-                values="Amount",
-            )
-            .reset_index()
+        return self._cached("syndicate_year_df", self._create_syndicate_year_df)
+
+    def create_mu_std_df(self, net: float = 20) -> pd.DataFrame:
+        return self._cached(
+            "mu_std_df", lambda: self._create_mu_std_df(net), float(net)
+        )
+
+    def create_model(self, alpha: float = 2, net: float = 20) -> pd.DataFrame:
+        """
+        Simulated quartile probabilities per syndicate. Seeded models are cached;
+        with seed None every call draws a new model.
+        """
+        compute = lambda: self._create_model(alpha, net)
+        if self.seed is None:
+            return compute()
+        return self._cached(
+            "model", compute, float(alpha), float(net), self.no_sims, self.seed
+        )
+
+    def _create_syndicate_year_df(self) -> pd.DataFrame:
+        syndicate_results = LloydsCube.of(self._lloyds).pivot(
+            self.lloyds_cob, self.start_year, ["Combined ratio", "Net"]
         )
 
         return self.apply_weightings(syndicate_results)
 
-    @lru_cache(maxsize=1)
-    def create_mu_std_df(self, net: float = 20) -> pd.DataFrame:
+    def _create_mu_std_df(self, net: float = 20) -> pd.DataFrame:
         syndicate_df = self.create_syndicate_year_df()
+        syndicate_df = syndicate_df.dropna()
+        by = ["ManagingAgent", "SyndicateCode"]
         syndicate_mu_sd = (
-            syndicate_df.dropna()
-            .groupby(["ManagingAgent", "SyndicateCode"])
-            .apply(
-                lambda x: pd.Series(
-                    [
-                        np.average(x["Combined ratio"], weights=x["weight"]),
-                        np.std(x["Combined ratio"]),
-                        np.mean(x.Net),
-                    ],
-                    index=["Mean", "Std", "Net"],
-                )
+            pd.DataFrame(
+                {
+                    # all zero weights give no mean and the syndicate is dropped
+                    "Mean": agg.weighted_mean(
+                        syndicate_df, by, "Combined ratio", "weight", empty=np.nan
+                    ),
+                    "Std": agg.std(syndicate_df, by, "Combined ratio"),
+                    "Net": agg.mean(syndicate_df, by, "Net"),
+                }
             )
             .reset_index()
             .dropna(subset=["Mean"])
@@ -65,35 +99,36 @@ class LloydsModel(Copula):
         )
         return syndicate_mu_sd
 
-    @lru_cache(maxsize=1)
-    def create_model(self, alpha: float = 2, net: float = 20) -> pd.DataFrame:
+    def _create_model(self, alpha: float = 2, net: float = 20) -> pd.DataFrame:
         syndicate_mu_sd = self.create_mu_std_df(net)
-        model = np.zeros(shape=(syndicate_mu_sd.shape[0], self.no_sims))
+        lognormal_seed, copula_seed = np.random.SeedSequence(self.seed).spawn(2)
         # Generate lognormal distribution ----
-        for index, row in syndicate_mu_sd.iterrows():
-            m = syndicate_mu_sd.loc[index, "Mean"]
-            v = syndicate_mu_sd.loc[index, "Std"]
-            sigma = np.sqrt(np.log(1 + (v**2 / m**2)))
-            mu = np.log(m) - (0.5 * (sigma) ** 2)
-            model[index] = np.random.lognormal(mu, sigma, self.no_sims)
-
-        # Apply correlation ---
+        m = syndicate_mu_sd["Mean"].to_numpy()[:, None]
+        v = syndicate_mu_sd["Std"].to_numpy()[:, None]
+        sigma = np.sqrt(np.log(1 + (v**2 / m**2)))
+        mu = np.log(m) - (0.5 * (sigma) ** 2)
+        model = np.random.default_rng(lognormal_seed).lognormal(
+            mu, sigma, (syndicate_mu_sd.shape[0], self.no_sims)
+        )
+
+        # Apply correlation: give each simulation the sorted loss ratio at the
+        # rank of its copula draw (Iman-Conover reordering) ---
         corr = np.transpose(
-            self.copulaInvClayton(self.no_sims, model.shape[0], alpha=alpha)
+            self.copulaInvClayton(
+                self.no_sims, model.shape[0], alpha=alpha, seed=copula_seed
+            )
         )
-        for row in range(0, model.shape[0], 1):
-            model[row, :] = [x for _, x in sorted(zip(corr[row, :], model[row, :]))]
+        model = np.take_along_axis(np.sort(model, axis=1), utils.ranks(corr, 1), axis=1)
 
-        # Convert to quartile results ---
-        model_q = model.copy()
-        for col in range(0, model.shape[1], 1):
-            model_q[:, col] = pd.qcut(model[:, col], 4).codes + 1
+        # Convert to quartile results, as pd.qcut(model[:, col], 4) per simulation:
+        # rank r of n is above the k-th quartile edge when r > k(n - 1)/4 ---
+        ranks = utils.ranks(model, 0)
+        edges = np.arange(1, 4) * (model.shape[0] - 1) / 4
+        model_q = 1 + np.digitize(ranks, edges, right=True)
 
         model_final = syndicate_mu_sd.copy()
         for i in [1, 2, 3, 4]:
-            model_final[f"Q{i}"] = pd.Series(
-                np.where(model_q == i, 1, 0).sum(axis=1) / self.no_sims
-            )
+            model_final[f"Q{i}"] = (model_q == i).sum(axis=1) / self.no_sims
 
         return model_final
 
@@ -184,7 +219,9 @@ class LloydsModel(Copula):
         return fig
 
     def plot_correlation_alpha(self, alpha: int = 2) -> px.scatter:
-        corr = np.transpose(self.copulaInvClayton(10000, 2, alpha=alpha))
+        corr = np.transpose(
+            self.copulaInvClayton(10000, 2, alpha=alpha, seed=self.seed)
+        )
         fig = px.scatter(
             x=corr[0], y=corr[1], color_discrete_sequence=sns.color_palette("Spectral")
         )
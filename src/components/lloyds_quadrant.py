@@ -4,41 +4,24 @@ import numpy as np
 import pandas as pd
 
 from src.utils.utils import utils
+from src.utils import aggregations as agg
+from src.components.lloyds_cube import LloydsCube
 
 
 def add_lloyds(
     cob_df: pd.DataFrame, lloyds: pd.DataFrame, COB: str, timeframe: int = 9
 ) -> pd.DataFrame:
+    cube = LloydsCube.of(lloyds)
+    df = cube.pivot(COB, cube.max_year - timeframe, how="mean").dropna()
     df = (
-        lloyds[
-            (lloyds["LloydsGlobalCOB"] == COB)
-            & (lloyds.Year >= lloyds.Year.max() - timeframe)
-            & (lloyds.Amount > 0)
-        ]
-        .groupby(["Year", "ManagingAgent", "SyndicateCode", "LineItem"])
-        .agg({"Amount": np.mean})
-        .reset_index()
-        .pivot(
-            index=["ManagingAgent", "SyndicateCode", "Year"],
-            columns=["LineItem"],
-            values=["Amount"],
-        )
-        .droplevel(0, axis=1)
-        .reset_index()
-        .dropna()
-        .groupby("Year")
-        .apply(
-            lambda x: pd.Series(
-                [
-                    utils.weighted_mean(
-                        x["Combined ratio"],
-                        weights=x["Net"],
-                    ),
-                    np.sum(x["Net"]),
-                    np.sum(x["Gross"]),
-                ],
-                index=["Combined ratio", "Net", "Gross"],
-            )
+        pd.DataFrame(
+            {
+                "Combined ratio": agg.weighted_mean(
+                    df, "Year", "Combined ratio", "Net"
+                ),
+                "Net": agg.total(df, "Year", "Net"),
+                "Gross": agg.total(df, "Year", "Gross"),
+            }
         )
         .assign(ManagingAgent="Lloyd's", SyndicateCode="Lloyd's")
         .reset_index()
@@ -54,46 +37,28 @@ def historic_cob(
     timeframe: int = 9,
     net: float = 20,
 ) -> pd.DataFrame:
-    df = (
-        lloyds[
-            (lloyds["LloydsGlobalCOB"] == COB)
-            & (lloyds.ActiveSyndicateFlag == "Active")
-            & (lloyds.Year >= lloyds.Year.max() - timeframe)
-            & (lloyds.Amount > 0)
-        ]
-        .groupby(["ManagingAgent", "SyndicateCode", "Year", "LineItem"])
-        .agg({"Amount": sum})
-        .reset_index()
-        .pivot(
-            index=["ManagingAgent", "SyndicateCode", "Year"],
-            columns="LineItem",
-            values="Amount",
-        )
-        .reset_index()
-    )
+    cube = LloydsCube.of(lloyds)
+    df = cube.pivot(COB, cube.max_year - timeframe)
     df2 = add_lloyds(df, lloyds, COB, timeframe)
     all_syndicates = np.append(
         syndicates,
-        df2[df2["Year"] == lloyds.Year.max()]
+        df2[df2["Year"] == cube.max_year]
         .sort_values("Net", ascending=False)["SyndicateCode"]
         .unique(),
     )
+    df2 = df2[df2.SyndicateCode.isin(all_syndicates)].dropna()
+    by = ["ManagingAgent", "SyndicateCode"]
     df2 = (
-        df2[df2.SyndicateCode.isin(all_syndicates)]
-        .dropna()
-        .groupby(["ManagingAgent", "SyndicateCode"])
-        .apply(
-            lambda x: pd.Series(
-                [
-                    utils.weighted_mean(
-                        x["Combined ratio"],
-                        weights=x["Net"],
-                    ),
-                    (np.std(x["Combined ratio"]) / np.mean(x["Combined ratio"])) * 100,
-                    (np.mean(x.Net)),
-                ],
-                index=["NCOR", "Volatility", "Net"],
-            )
+        pd.DataFrame(
+            {
+                "NCOR": agg.weighted_mean(df2, by, "Combined ratio", "Net"),
+                "Volatility": (
+                    agg.std(df2, by, "Combined ratio")
+                    / agg.mean(df2, by, "Combined ratio")
+                )
+                * 100,
+                "Net": agg.mean(df2, by, "Net"),
+            }
         )
         .reset_index()
         .dropna()
@@ -3,15 +3,14 @@ import numpy as np
 import pandas as pd
 
 from src.utils.utils import utils
+from src.components.lloyds_cube import LloydsCube
 
 
 def quartile_performance(lloyds: pd.DataFrame, COB: str = "") -> pd.DataFrame:
-    df = lloyds[
-        (lloyds["Year"] >= lloyds.Year.max() - 1)
-        & (lloyds["LineItem"].isin(["Combined ratio"]))
-        & (lloyds["LloydsGlobalCOB"] == COB)
-        & (lloyds.Amount > 0)
-    ][["Year", "SyndicateCode", "ManagingAgent", "Amount"]]
+    cube = LloydsCube.of(lloyds)
+    df = cube.pivot(COB, cube.max_year - 1, ["Combined ratio"]).rename(
+        columns={"Combined ratio": "Amount"}
+    )
 
     df = (
         df.pivot(
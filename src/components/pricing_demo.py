@@ -6,32 +6,70 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from dateutil import parser
 from datetime import datetime
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 from math import prod
 from typing import Optional, Any, List, Dict
 from dataclasses import dataclass
 from src.utils.zipoisson import ZIPoisson
+from src.utils.sketch import RunningMoments, QuantileSketch
+from src.utils.compound import CompoundDistribution, compound_distribution
+from src.utils.cache import LRUCache
+from src.utils.rating_tables import CompiledRatingTables, RatingTable
+from src.utils.utils import utils
 
 DOWW_LISTED_INDICATOR_PUBLIC: str = "No ADR"
 
 
-@dataclass
-class MetaData:
-    metadata = pd.read_csv("./data/do_metadata.csv")
+class DOWWMetaData:
+    """
+    D&O WW rating tables, compiled from ./data/do_metadata.csv on first use
+    (see CompiledRatingTables). The *_RATE attributes are code -> rate dicts;
+    table(name) gives the array form used for batch lookups.
+    """
+
+    tables = CompiledRatingTables(
+        "./data/do_metadata.csv",
+        {
+            "DOMICILE_RATE": 0,
+            "INDUSTRY_RATE": 2,
+            "LISTING_RATE": 4,
+            "LISTINGADR_RATE": 6,
+            "COVER_RATE": 8,
+            "RETRO_RATE": 10,
+        },
+    )
+
+    FIXED_FACTOR = 1.1
 
-    DOMICILE_RATE = dict(zip(*metadata.iloc[:, 0:2].dropna().values.T))
+    def table(self, name: str) -> RatingTable:
+        return self.tables[name]
 
-    INDUSTRY_RATE = dict(zip(*metadata.iloc[:, 2:4].dropna().values.T))
+    @property
+    def DOMICILE_RATE(self) -> Dict:
+        return self.table("DOMICILE_RATE").as_dict
 
-    LISTING_RATE = dict(zip(*metadata.iloc[:, 4:6].dropna().values.T))
+    @property
+    def INDUSTRY_RATE(self) -> Dict:
+        return self.table("INDUSTRY_RATE").as_dict
 
-    LISTINGADR_RATE = dict(zip(*metadata.iloc[:, 6:8].dropna().values.T))
+    @property
+    def LISTING_RATE(self) -> Dict:
+        return self.table("LISTING_RATE").as_dict
 
-    COVER_RATE = dict(zip(*metadata.iloc[:, 8:10].dropna().values.T))
+    @property
+    def LISTINGADR_RATE(self) -> Dict:
+        return self.table("LISTINGADR_RATE").as_dict
 
-    RETRO_RATE = dict(zip(*metadata.iloc[:, 10:12].dropna().values.T))
+    @property
+    def COVER_RATE(self) -> Dict:
+        return self.table("COVER_RATE").as_dict
 
-    FIXED_FACTOR = 1.1
+    @property
+    def RETRO_RATE(self) -> Dict:
+        return self.table("RETRO_RATE").as_dict
 
+    @staticmethod
     def ilf_cuve(x: float) -> float:
         """
         Ilf Curve
@@ -47,6 +85,9 @@ class MetaData:
         return (x / base_limit) ** np.emath.logn(1 + z, 2)
 
 
+MetaData = DOWWMetaData()
+
+
 @dataclass
 class RequestDOWW:
     y_o_a: int
@@ -254,7 +295,7 @@ def term_adjustment(
     return model_premium * adjustment
 
 
-def get_doww_factors(input_doww: RequestDOWW, metadata: MetaData) -> FactorsDOWW:
+def get_doww_factors(input_doww: RequestDOWW, metadata: DOWWMetaData) -> FactorsDOWW:
     class_name = "DO WW"
 
     country_factor = metadata.DOMICILE_RATE[input_doww.country_id]
@@ -363,6 +404,128 @@ def get_price_doww(input_doww: RequestDOWW) -> float:
     )
 
 
+def _parse_dates(dates: pd.Series) -> pd.Series:
+    """Day-first dates, with a fixed format fast path before falling back"""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    parsed = pd.to_datetime(dates, format="%d/%m/%Y", errors="coerce")
+    failed = parsed.isna() & dates.notna()
+    if failed.any():
+        parsed[failed] = pd.to_datetime(dates[failed], dayfirst=True, format="mixed")
+    return parsed
+
+
+def get_doww_factors_batch(
+    policies: pd.DataFrame, metadata: DOWWMetaData
+) -> pd.DataFrame:
+    """
+    Columnar get_doww_factors: one row of factors per policy row.
+
+    params:
+        policies: DataFrame with the RequestDOWW fields as columns
+        metadata: rating tables
+
+    returns:
+        DataFrame of factors, aligned with policies
+    """
+    class_name = "DO WW"
+
+    factors = pd.DataFrame(index=policies.index)
+    factors["limit_plus_excess"] = metadata.ilf_cuve(
+        policies.limit.to_numpy(dtype=float) + policies.excess.to_numpy(dtype=float)
+    )
+    factors["excess"] = metadata.ilf_cuve(policies.excess.to_numpy(dtype=float))
+    factors["ilf"] = np.where(
+        factors.limit_plus_excess != factors.excess,
+        factors.limit_plus_excess - factors.excess,
+        factors.excess,
+    )
+    factors["country"] = metadata.table("DOMICILE_RATE").lookup(policies.country_id)
+    factors["industry"] = metadata.table("INDUSTRY_RATE").lookup(policies.industry_id)
+    factors["listed_indicator"] = metadata.table("LISTING_RATE").lookup(
+        policies.listed_indicator_id
+    )
+    public = policies.adr_id == DOWW_LISTED_INDICATOR_PUBLIC
+    factors["listingadr"] = 1.0
+    factors.loc[~public, "listingadr"] = metadata.table("LISTINGADR_RATE").lookup(
+        policies.adr_id[~public]
+    )
+    factors["cover"] = metadata.table("COVER_RATE").lookup(policies.cover_id)
+    factors["retro_date"] = metadata.table("RETRO_RATE").lookup(
+        policies.retro_option_id
+    )
+    factors["fixed"] = metadata.FIXED_FACTOR
+
+    commissions = policies.brokerage + policies.other_commissions
+    factors["brokerage"] = np.where(commissions == 1, 1, 1 / (1 - commissions))
+
+    target_loss_ratio = {
+        yoa: get_target_loss_ratio(class_name=class_name, year_of_account=yoa)
+        for yoa in policies.y_o_a.unique()
+    }
+    factors["profit"] = 1 / policies.y_o_a.map(target_loss_ratio)
+
+    factors["multiplier"] = factors[
+        [
+            "ilf",
+            "country",
+            "industry",
+            "listed_indicator",
+            "listingadr",
+            "cover",
+            "retro_date",
+            "fixed",
+        ]
+    ].prod(axis=1)
+    return factors
+
+
+def get_price_doww_batch(policies: pd.DataFrame) -> pd.DataFrame:
+    """
+    Price a whole portfolio of D&O policies at once. Same calculation as
+    get_price_doww but columnar: factor lookups, ILFs and term adjustments
+    are evaluated over the whole frame.
+
+    params:
+        policies: DataFrame with the RequestDOWW fields as columns. Dates may
+            be datetimes or day-first strings.
+
+    returns:
+        DataFrame of factors and each intermediate premium, aligned with policies
+    """
+    ensure_config_variables(
+        {
+            "DOWW_LISTED_INDICATOR_PUBLIC": DOWW_LISTED_INDICATOR_PUBLIC,
+        }
+    )
+    priced = get_doww_factors_batch(policies, MetaData)
+
+    # Annual Risk Premium: Price from pricing model
+    priced["base_loss_cost"] = policies.assets.to_numpy(dtype=float)
+    priced["annual_risk_premium"] = priced.multiplier * priced.base_loss_cost
+
+    # Risk Premium: Price adjusted for term
+    days = (
+        _parse_dates(policies.expiry_date) - _parse_dates(policies.inception_date)
+    ).dt.days
+    term = np.where((days - 365).abs() <= 2, 1, (days + 1) / 365)
+    priced["risk_premium"] = priced.annual_risk_premium * term
+
+    # Risk Premium With Commission Loading: Price adjusted for commission/brokerage
+    priced["risk_premium_with_commission_loading"] = (
+        priced.risk_premium * priced.brokerage
+    )
+    priced["risk_premium_with_commission_inflation_loadings"] = priced[
+        "risk_premium_with_commission_loading"
+    ]
+
+    # Price: Calculated final price
+    priced["price"] = (
+        priced.risk_premium_with_commission_inflation_loadings * priced.profit
+    )
+    return priced
+
+
 def lognorm_params(mean: float, std: float) -> list:
     """
     https://www.johndcook.com/blog/2022/02/24/find-log-normal-parameters/
@@ -372,21 +535,18 @@ def lognorm_params(mean: float, std: float) -> list:
     return (sigma, mu)
 
 
-def aggregate_loss_model(
-    severity: str,
-    frequency: str,
-    sev_mean: float,
-    sev_sd: float,
-    freq_mean: float,
-    freq_sd: float,
-    freq_zi_p: float,
-    limit: float,
-    attachment: float,
-    aad: float = 0,
-    aal: float = 0,
-    n_sims: float = 10000,
-    ground_up: bool = True,
-) -> List[float]:
+def severity_distribution(severity: str, sev_mean: float, sev_sd: float):
+    """
+    Frozen severity distribution parameterised by its mean and standard deviation
+
+    params:
+        severity: "LogNormal" or "Gamma"
+        sev_mean: average claim severity
+        sev_sd: standard deviation of claim severity
+
+    returns:
+        scipy frozen distribution
+    """
     match severity:
         case "LogNormal":
             sigma, mu = lognorm_params(sev_mean, sev_sd)
@@ -395,7 +555,24 @@ def aggregate_loss_model(
             sev = stats.gamma(
                 a=(sev_mean / sev_sd) ** 2, loc=0, scale=(sev_sd**2 / sev_mean)
             )
+    return sev
+
+
+def frequency_distribution(
+    frequency: str, freq_mean: float, freq_sd: float, freq_zi_p: float
+):
+    """
+    Claim count distribution parameterised by its mean and standard deviation
+
+    params:
+        frequency: "Poisson", "NBinomial" or "Zero-Inflated Poisson"
+        freq_mean: average claim frequency
+        freq_sd: standard deviation of claim frequency (NBinomial only)
+        freq_zi_p: probability of a structural zero (Zero-Inflated Poisson only)
 
+    returns:
+        scipy discrete distribution
+    """
     match frequency:
         case "Poisson":
             freq = stats.poisson(mu=freq_mean)
@@ -405,50 +582,460 @@ def aggregate_loss_model(
             freq = stats.nbinom(n=freq_n, p=freq_p)
         case "Zero-Inflated Poisson":
             freq = ZIPoisson(freq_zi_p, freq_mean)
+    return freq
 
-    ## Agg Model: MC Simulation ##
-    losses = list()
+
+def simulate_annual_losses(
+    freq: Any,
+    sev: Any,
+    n_sims: int,
+    limit: float,
+    attachment: float,
+    aad: float = 0,
+    aal: float = 0,
+    ground_up: bool = True,
+    random_state: Any = None,
+) -> np.ndarray:
+    """
+    Batched frequency/severity simulation. Every claim for every simulated year
+    is drawn in one call and summed back to its year via the claim counts.
+
+    params:
+        freq: claim count distribution (see frequency_distribution)
+        sev: claim severity distribution (see severity_distribution)
+        n_sims: number of simulated years
+        limit, attachment: per occurrence layer terms
+        aad, aal: annual aggregate deductible and limit (0 for no aal)
+        ground_up: ignore the layer terms if True
+        random_state: seed or numpy Generator passed through to rvs
+
+    returns:
+        unsorted annual losses, one per simulated year
+    """
+    counts = freq.rvs(size=int(n_sims), random_state=random_state)
+    claims = sev.rvs(size=int(counts.sum()), random_state=random_state)
     if ground_up:
-        for i in freq.rvs(size=n_sims):
-            losses.append(np.sum(sev.rvs(size=i)))
+        return utils.segment_sum(claims, counts)
+
+    claims -= attachment
+    np.clip(claims, 0, limit, out=claims)
+    """
+    Alternative definition of AAD where it benefits the insured.
+    See PIGI page 35
+
+    if aad > 0 and np.sum(np.minimum(sim_n, attachment)) > aad:
+        sim_n_agg += np.sum(np.minimum(sim_n, attachment)) - aad
+    """
+    losses = utils.segment_sum(claims, counts)
+    losses = np.maximum(losses - aad, 0)
+    if aal > 0:
+        losses = np.minimum(losses, aal)
+
+    return losses
+
+
+@dataclass
+class AggregateSummary:
+    """
+    Running statistics of a streamed aggregate loss simulation. Holds the
+    moments and a quantile sketch instead of the simulated years, so memory
+    does not grow with n_sims.
+    """
+
+    moments: RunningMoments
+    sketch: QuantileSketch
+
+    @classmethod
+    def empty(cls, relative_accuracy: float = 0.005) -> "AggregateSummary":
+        return cls(RunningMoments(), QuantileSketch(relative_accuracy))
+
+    def update(self, losses: np.ndarray) -> "AggregateSummary":
+        self.moments.update(losses)
+        self.sketch.update(losses)
+        return self
+
+    def merge(self, other: "AggregateSummary") -> "AggregateSummary":
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def n(self) -> int:
+        return self.moments.n
+
+    def mean(self) -> float:
+        return self.moments.mean
+
+    def std(self) -> float:
+        return self.moments.std()
+
+    def sem(self) -> float:
+        return self.moments.std(ddof=1) / np.sqrt(self.n)
+
+    def percentile(self, q: float) -> np.ndarray:
+        return self.sketch.quantile(np.asarray(q) / 100)
+
+    def tail_mean(self, q: float) -> float:
+        return self.sketch.tail_mean(q / 100)
+
+
+@dataclass(frozen=True)
+class AggregateModelSpec:
+    """
+    Inputs of the aggregate loss model. Picklable, so worker processes can
+    rebuild the distributions themselves.
+    """
+
+    severity: str
+    frequency: str
+    sev_mean: float
+    sev_sd: float
+    freq_mean: float
+    freq_sd: float
+    freq_zi_p: float
+    limit: float
+    attachment: float
+    aad: float = 0
+    aal: float = 0
+    ground_up: bool = True
+
+    def simulate(self, n_sims: int, random_state: Any = None) -> np.ndarray:
+        sev = severity_distribution(self.severity, self.sev_mean, self.sev_sd)
+        freq = frequency_distribution(
+            self.frequency, self.freq_mean, self.freq_sd, self.freq_zi_p
+        )
+        return simulate_annual_losses(
+            freq,
+            sev,
+            n_sims,
+            self.limit,
+            self.attachment,
+            self.aad,
+            self.aal,
+            self.ground_up,
+            random_state=random_state,
+        )
+
+
+SIMULATION_BLOCK_SIZE: int = 100000
+
+
+def _simulation_blocks(n_sims: float, block_size: Optional[int], seed: Optional[int]):
+    """
+    Split n_sims into fixed-size blocks, each with an independent child seed
+    stream. The split depends only on n_sims and block_size, never on the
+    number of workers, so a seed gives the same result however it is run.
+    """
+    n_sims = int(n_sims)
+    block_size = int(block_size or SIMULATION_BLOCK_SIZE)
+    sizes = [min(block_size, n_sims - start) for start in range(0, n_sims, block_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return sizes, seeds
+
+
+def _simulate_block(
+    spec: AggregateModelSpec,
+    dtype: Any,
+    relative_accuracy: Optional[float],
+    size: int,
+    seed: np.random.SeedSequence,
+):
+    losses = spec.simulate(size, np.random.default_rng(seed)).astype(dtype, copy=False)
+    if relative_accuracy is None:
+        return losses
+    return AggregateSummary.empty(relative_accuracy).update(losses)
+
+
+def _run_blocks(task, sizes: List[int], seeds: List, workers: Optional[int] = 1):
+    """Run task over the blocks, serially or on a process pool, in block order"""
+    if workers is None or workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(task, sizes, seeds)
     else:
-        for i in freq.rvs(size=n_sims):
-            sim_n = sev.rvs(size=i)
-            sim_n_agg = np.sum(np.minimum(np.maximum(sim_n - attachment, 0), limit))
-            """
-            Alternative definition of AAD where it benefits the insured.
-            See PIGI page 35
+        yield from map(task, sizes, seeds)
+
+
+def _simulate_losses(
+    spec: AggregateModelSpec,
+    n_sims: float,
+    chunk_size: Optional[int],
+    dtype: Any,
+    seed: Optional[int],
+    workers: Optional[int],
+) -> np.ndarray:
+    sizes, seeds = _simulation_blocks(n_sims, chunk_size, seed)
+    losses = np.empty(int(n_sims), dtype=dtype)
+    start = 0
+    task = partial(_simulate_block, spec, dtype, None)
+    for chunk in _run_blocks(task, sizes, seeds, workers):
+        losses[start : start + chunk.size] = chunk
+        start += chunk.size
+    return np.sort(losses)[::-1]
+
+
+def _stream_losses(
+    spec: AggregateModelSpec,
+    n_sims: float,
+    chunk_size: Optional[int],
+    dtype: Any,
+    seed: Optional[int],
+    workers: Optional[int],
+    relative_accuracy: float,
+) -> AggregateSummary:
+    sizes, seeds = _simulation_blocks(n_sims, chunk_size, seed)
+    summary = AggregateSummary.empty(relative_accuracy)
+    task = partial(_simulate_block, spec, dtype, relative_accuracy)
+    for chunk_summary in _run_blocks(task, sizes, seeds, workers):
+        summary.merge(chunk_summary)
+    return summary
+
+
+# Shared by every session of the app: repeated seeded runs return instantly
+simulation_cache = LRUCache(max_bytes=512 * 2**20)
+
+
+def _simulation_key(name: str, spec, n_sims, chunk_size, dtype, seed, *args) -> str:
+    chunk_size = int(chunk_size or SIMULATION_BLOCK_SIZE)
+    return LRUCache.make_key(
+        name, spec, int(n_sims), chunk_size, np.dtype(dtype).str, seed, *args
+    )
 
-            if aad > 0 and np.sum(np.minimum(sim_n, attachment)) > aad:
-                sim_n_agg += np.sum(np.minimum(sim_n, attachment)) - aad
-            """
-            losses.append(sim_n_agg)
-        losses = np.maximum(losses - np.array(aad), 0)
-        if aal > 0:
-            losses = np.minimum(losses, aal)
 
-    sim_losses = sorted(losses)[::-1]
+def aggregate_loss_model(
+    severity: str,
+    frequency: str,
+    sev_mean: float,
+    sev_sd: float,
+    freq_mean: float,
+    freq_sd: float,
+    freq_zi_p: float,
+    limit: float,
+    attachment: float,
+    aad: float = 0,
+    aal: float = 0,
+    n_sims: float = 10000,
+    ground_up: bool = True,
+    chunk_size: Optional[int] = None,
+    dtype: Any = np.float64,
+    seed: Optional[int] = None,
+    workers: Optional[int] = 1,
+    use_cache: bool = True,
+) -> np.ndarray:
+    """
+    Monte Carlo aggregate loss model
+
+    params:
+        chunk_size: simulate this many years at a time to bound the memory
+            used by individual claims (default SIMULATION_BLOCK_SIZE)
+        dtype: dtype of the stored annual losses (eg np.float32)
+        seed: entropy for the SeedSequence the chunk streams are spawned from
+        workers: number of processes (None for all cores). Results for a given
+            seed and chunk_size do not depend on the number of workers.
+        use_cache: look up seeded runs in simulation_cache. The cached array is
+            shared and read-only.
 
-    return sim_losses
+    returns:
+        annual losses sorted largest first
+    """
+    spec = AggregateModelSpec(
+        severity,
+        frequency,
+        sev_mean,
+        sev_sd,
+        freq_mean,
+        freq_sd,
+        freq_zi_p,
+        limit,
+        attachment,
+        aad,
+        aal,
+        ground_up,
+    )
+
+    ## Agg Model: MC Simulation ##
+    simulate = partial(_simulate_losses, spec, n_sims, chunk_size, dtype, seed, workers)
+    if not use_cache or seed is None:
+        return simulate()
+    key = _simulation_key("aggregate_loss_model", spec, n_sims, chunk_size, dtype, seed)
+    return simulation_cache.get_or_compute(key, simulate)
+
+
+def aggregate_loss_stream(
+    severity: str,
+    frequency: str,
+    sev_mean: float,
+    sev_sd: float,
+    freq_mean: float,
+    freq_sd: float,
+    freq_zi_p: float,
+    limit: float,
+    attachment: float,
+    aad: float = 0,
+    aal: float = 0,
+    n_sims: float = 10000,
+    ground_up: bool = True,
+    chunk_size: Optional[int] = None,
+    dtype: Any = np.float64,
+    seed: Optional[int] = None,
+    workers: Optional[int] = 1,
+    relative_accuracy: float = 0.005,
+    use_cache: bool = True,
+) -> AggregateSummary:
+    """
+    Streaming version of aggregate_loss_model for very large n_sims. Years are
+    simulated chunk_size at a time and folded into an AggregateSummary, so
+    memory is bounded by the chunk size rather than n_sims. Per-chunk
+    summaries are merged in chunk order whatever the number of workers.
+
+    params:
+        relative_accuracy: relative error of the percentiles from the sketch
+
+    returns:
+        AggregateSummary accepted by aggregate_table, confidence_interval,
+        aggregate_chart and the VaR/TVaR helpers
+    """
+    spec = AggregateModelSpec(
+        severity,
+        frequency,
+        sev_mean,
+        sev_sd,
+        freq_mean,
+        freq_sd,
+        freq_zi_p,
+        limit,
+        attachment,
+        aad,
+        aal,
+        ground_up,
+    )
+
+    stream = partial(
+        _stream_losses,
+        spec,
+        n_sims,
+        chunk_size,
+        dtype,
+        seed,
+        workers,
+        relative_accuracy,
+    )
+    if not use_cache or seed is None:
+        return stream()
+    key = _simulation_key(
+        "aggregate_loss_stream",
+        spec,
+        n_sims,
+        chunk_size,
+        dtype,
+        seed,
+        relative_accuracy,
+    )
+    return simulation_cache.get_or_compute(key, stream)
+
+
+def aggregate_loss_distribution(
+    severity: str,
+    frequency: str,
+    sev_mean: float,
+    sev_sd: float,
+    freq_mean: float,
+    freq_sd: float,
+    freq_zi_p: float,
+    limit: float,
+    attachment: float,
+    aad: float = 0,
+    aal: float = 0,
+    n_sims: float = 10000,
+    ground_up: bool = True,
+    seed: Optional[int] = None,
+    n_points: int = 2**16,
+) -> CompoundDistribution:
+    """
+    Analytic alternative to aggregate_loss_model: the aggregate distribution of
+    the layer computed by FFT on a discretised severity grid, so there is no
+    simulation noise. Takes the same arguments (n_sims and seed are unused).
+
+    params:
+        n_points: size of the discretisation grid
+
+    returns:
+        CompoundDistribution accepted by aggregate_table, confidence_interval,
+        aggregate_chart and the VaR/TVaR helpers
+    """
+    sev = severity_distribution(severity, sev_mean, sev_sd)
+    freq = frequency_distribution(frequency, freq_mean, freq_sd, freq_zi_p)
+
+    if ground_up:
+        return compound_distribution(freq, sev, n_points=n_points)
+    return compound_distribution(
+        freq, sev, limit, attachment, aad, aal, n_points=n_points
+    )
+
+
+LOSS_DISTRIBUTIONS = (AggregateSummary, CompoundDistribution)
+
+
+def _percentile(sim_losses: Any, q: float) -> np.ndarray:
+    if isinstance(sim_losses, LOSS_DISTRIBUTIONS):
+        return sim_losses.percentile(q)
+    return np.percentile(sim_losses, q=q)
 
 
 def confidence_interval(sim_losses: List[float], interval: float = 0.95) -> float:
+    if isinstance(sim_losses, CompoundDistribution):
+        # exact distribution: no sampling error around the mean
+        return (sim_losses.mean(), sim_losses.mean())
+    if isinstance(sim_losses, AggregateSummary):
+        n, mean, sem = sim_losses.n, sim_losses.mean(), sim_losses.sem()
+    else:
+        n, mean, sem = len(sim_losses), np.mean(sim_losses), stats.sem(sim_losses)
     ci = stats.t.interval(
         interval,
-        df=len(sim_losses) - 1,
-        loc=np.mean(sim_losses),
-        scale=stats.sem(sim_losses),
+        df=n - 1,
+        loc=mean,
+        scale=sem,
     )
     return ci
 
 
+def value_at_risk(sim_losses: List[float], rp: float) -> float:
+    """
+    Loss at the 1-in-rp return period. sim_losses is sorted largest first.
+    """
+    if isinstance(sim_losses, LOSS_DISTRIBUTIONS):
+        return float(sim_losses.percentile(100 * (1 - 1 / rp)))
+    return np.mean(sim_losses[int(len(sim_losses) / rp)])
+
+
+def tail_value_at_risk(sim_losses: List[float], rp: float) -> float:
+    """
+    Average loss beyond the 1-in-rp return period.
+    """
+    if isinstance(sim_losses, LOSS_DISTRIBUTIONS):
+        return sim_losses.tail_mean(100 * (1 - 1 / rp))
+    return np.mean(sim_losses[: int(len(sim_losses) / rp)])
+
+
+def spread_value_at_risk(sim_losses: List[float], rp: float, spread: float = 25):
+    """
+    Average loss between the 1-in-(rp+spread) and 1-in-(rp-spread) return periods.
+    """
+    rp_low = max(rp - spread, 1)
+    if isinstance(sim_losses, LOSS_DISTRIBUTIONS):
+        # difference of tail expectations gives the mean within the band
+        p_low, p_high = 1 - 1 / rp_low, 1 - 1 / (rp + spread)
+        band = sim_losses.tail_mean(100 * p_low) * (1 - p_low)
+        band -= sim_losses.tail_mean(100 * p_high) * (1 - p_high)
+        return band / (p_high - p_low)
+    n_sims = len(sim_losses)
+    return np.mean(sim_losses[int(n_sims / (rp + spread)) : int(n_sims / rp_low)])
+
+
 def aggregate_table(sim_losses: List[float]) -> pd.DataFrame:
     rp = [1000, 500, 250, 200, 100, 50, 25, 10, 5, 2, 5, 10, 25, 50]
     percentiles = [99.99, 99.8, 99.6, 99.5, 99, 98, 96, 90, 80, 50, 20, 10, 4, 2]
     up_down = pd.DataFrame({"Return Period": rp, "Percentile": percentiles})
-    up_down["Total Loss ($USD)"] = up_down["Percentile"].apply(
-        lambda x: np.percentile(sim_losses, q=x)
-    )
+    up_down["Total Loss ($USD)"] = _percentile(sim_losses, up_down["Percentile"])
     return up_down.style.format(
         {"Total Loss ($USD)": "${:,.2f}", "Percentile": "{:.2f}"}
     )
@@ -457,9 +1044,15 @@ def aggregate_table(sim_losses: List[float]) -> pd.DataFrame:
 def aggregate_chart(
     sim_losses: List[float], rp: float, n_sims: float = 10000
 ) -> go.Figure:
+    if isinstance(sim_losses, LOSS_DISTRIBUTIONS):
+        x = np.geomspace(100 / n_sims, 100, 1000)[::-1]
+        y = sim_losses.percentile(x)
+    else:
+        x = ((np.arange(1, n_sims + 1, 1) / n_sims) * 100)[::-1]
+        y = sim_losses
     fig = px.line(
-        y=sim_losses,
-        x=((np.arange(1, n_sims + 1, 1) / n_sims) * 100)[::-1],
+        y=y,
+        x=x,
         log_x=True,
         color_discrete_sequence=["#FF3333"],
     )
@@ -482,15 +1075,7 @@ def frequency_chart(
     freq_zi_p: float,
     n_sims: float = 10000,
 ) -> go.Figure:
-    match frequency:
-        case "Poisson":
-            freq = stats.poisson(mu=freq_mean)
-        case "NBinomial":
-            freq_p = 1 / (freq_sd**2 / freq_mean)
-            freq_n = freq_mean * freq_p / (1 - freq_p)
-            freq = stats.nbinom(n=freq_n, p=freq_p)
-        case "Zero-Inflated Poisson":
-            freq = ZIPoisson(freq_zi_p, freq_mean)
+    freq = frequency_distribution(frequency, freq_mean, freq_sd, freq_zi_p)
     # fig = px.histogram(freq.rvs(size=n_sims), color_discrete_sequence=["#FF3333"])
     x = np.arange(
         freq.ppf(0.01),
@@ -528,14 +1113,7 @@ def frequency_chart(
 def severity_chart(
     severity: str, sev_mean: float, sev_sd: float, n_sims: float = 10000
 ) -> go.Figure:
-    match severity:
-        case "LogNormal":
-            sigma, mu = lognorm_params(sev_mean, sev_sd)
-            sev = stats.lognorm(s=sigma, loc=0, scale=np.exp(mu))
-        case "Gamma":
-            sev = stats.gamma(
-                a=(sev_mean / sev_sd) ** 2, loc=0, scale=(sev_sd**2 / sev_mean)
-            )
+    sev = severity_distribution(severity, sev_mean, sev_sd)
     # fig = px.histogram(sev.rvs(size=n_sims), color_discrete_sequence=["#FF3333"])
     x = np.linspace(
         sev.ppf(0.01),
@@ -0,0 +1,51 @@
+"""
+PURPOSE:  Vectorized grouped statistics built from groupby sums
+
+CREATED:  2026/10/18
+"""
+
+import numpy as np
+import pandas as pd
+
+from typing import List, Union
+
+By = Union[str, List[str]]
+
+
+def _groupby(df: pd.DataFrame, by: By):
+    return df.groupby(by, sort=True, observed=True)
+
+
+def total(df: pd.DataFrame, by: By, value: str) -> pd.Series:
+    """Sum of value per group, NaN where a group has no values"""
+    return _groupby(df, by)[value].sum(min_count=1)
+
+
+def mean(df: pd.DataFrame, by: By, value: str) -> pd.Series:
+    return _groupby(df, by)[value].mean()
+
+
+def weighted_mean(
+    df: pd.DataFrame, by: By, value: str, weight: str, empty: float = 0.0
+) -> pd.Series:
+    """
+    sum(w * x) / sum(w) per group. Groups whose weights sum to zero get empty,
+    0 by default as in utils.weighted_mean.
+    """
+    sums = _groupby(df.assign(_wx=df[value] * df[weight]), by)[["_wx", weight]].sum()
+    return (
+        (sums["_wx"] / sums[weight].where(sums[weight] != 0))
+        .fillna(empty)
+        .rename(value)
+    )
+
+
+def std(df: pd.DataFrame, by: By, value: str, ddof: int = 0) -> pd.Series:
+    """
+    Standard deviation per group (ddof=0 as np.std) from the sum of squared
+    deviations about each group's mean
+    """
+    grouped = _groupby(df, by)[value]
+    deviation = df[value] - grouped.transform("mean")
+    squares = _groupby(df.assign(_sq=deviation**2), by)["_sq"].sum()
+    return np.sqrt(squares / (grouped.count() - ddof)).rename(value)
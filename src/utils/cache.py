@@ -0,0 +1,112 @@
+"""
+PURPOSE:  Content-addressed, size-bounded LRU cache for model results
+
+CREATED:  2026/10/18
+"""
+
+import sys
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+def sizeof(value: Any) -> int:
+    """Approximate memory held by a cached value in bytes"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (tuple, list)):
+        return sum(sizeof(v) for v in value)
+    if hasattr(value, "__dict__"):
+        return sum(sizeof(v) for v in vars(value).values())
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by the total size of its
+    values. Keys are content hashes of the inputs (see make_key). If a
+    directory is given, NumPy array results are also written there as
+    compressed .npz files and reloaded after eviction or a restart.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20, directory: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.npz"
+
+    def _insert(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._sizes[key] = sizeof(value)
+        # evict least recently used entries, always keeping the newest
+        while len(self._entries) > 1 and self.nbytes > self.max_bytes:
+            old, _ = self._entries.popitem(last=False)
+            del self._sizes[old]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            if self.directory and self._path(key).exists():
+                with np.load(self._path(key)) as npz:
+                    value = npz["value"]
+                value.flags.writeable = False
+                self._insert(key, value)
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def put(self, key: str, value: Any) -> Any:
+        if isinstance(value, np.ndarray):
+            # cached arrays are shared between callers
+            value.flags.writeable = False
+            if self.directory:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                np.savez_compressed(self._path(key), value=value)
+        with self._lock:
+            self._insert(key, value)
+        return value
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, compute())
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
@@ -4,108 +4,234 @@ PURPOSE:  Functions to generate correlated random varialbles using copulas
 CREATED:  2022/12/29
 """
 
-import scipy.stats as sc
+import hashlib
+from scipy.special import ndtr, stdtr
 import statsmodels.stats.correlation_tools as ct
 import numpy as np
 import pandas as pd
 
+from src.utils.cache import LRUCache
+
+
+# Number of simulations generated per block by the Gaussian and Student t copulas
+COPULA_CHUNK_SIZE = 100000
+
+# Cholesky factors keyed on the content of the correlation matrix
+factor_cache = LRUCache(max_bytes=64 * 2**20)
+
+
+def cholesky_factor(corrM: np.ndarray) -> np.ndarray:
+    """
+    Cholesky factor of the nearest positive semi definite correlation matrix.
+    The matrix is validated and factorised once per distinct content; repeated
+    calls return the cached (read-only) factor.
+    """
+    corrM = np.ascontiguousarray(corrM, dtype=float)
+    if corrM.ndim != 2 or corrM.shape[0] != corrM.shape[1]:
+        raise ValueError(f"Correlation matrix must be square, got {corrM.shape}")
+    if not np.allclose(corrM, corrM.T):
+        raise ValueError("Correlation matrix must be symmetric")
+    if not np.allclose(np.diag(corrM), 1) or np.any(np.abs(corrM) > 1 + 1e-12):
+        raise ValueError("Correlation matrix must have a unit diagonal and |r| <= 1")
+    key = LRUCache.make_key(
+        "cholesky", corrM.shape, hashlib.sha256(corrM.tobytes()).hexdigest()
+    )
+    # Find nearest positive semi definite correlation matrix, then its Cholesky
+    # Decomposition
+    return factor_cache.get_or_compute(
+        key, lambda: np.linalg.cholesky(ct.corr_nearest(corrM))
+    )
+
+
+class GaussianCopula:
+    """
+    Gaussian copula over a fixed correlation matrix. The factorisation is done
+    once on construction, so each sample only costs the normal draws, the
+    matrix multiply and the cdf transform.
+
+    params:
+        corrM: correlation matrix (nVar x nVar)
+        dtype: np.float64 or np.float32
+        seed: seed or np.random.Generator
+    """
+
+    def __init__(self, corrM: np.ndarray, dtype: type = np.float64, seed=None):
+        self.A = cholesky_factor(corrM)
+        self.dtype = np.dtype(dtype).type
+        self.rng = np.random.default_rng(seed)
+        self._At = np.ascontiguousarray(self.A.T, dtype=self.dtype)
+
+    @property
+    def nVar(self) -> int:
+        return self.A.shape[0]
+
+    def _transform(self, x: np.ndarray) -> np.ndarray:
+        # set u equal to cdf at x from N(0,1)
+        return ndtr(x, out=x)
+
+    def chunks(
+        self, n: int, chunkSize: int = COPULA_CHUNK_SIZE, out: np.ndarray = None
+    ):
+        """
+        Yield the uniforms as (chunkSize, nVar) blocks, written into consecutive
+        rows of out when given. The i.i.d. normals are drawn into one reused
+        buffer, so no full size intermediate is allocated.
+        """
+        z = np.empty((min(chunkSize, n), self.nVar), dtype=self.dtype)
+        for start in range(0, n, chunkSize):
+            m = min(chunkSize, n - start)
+            self.rng.standard_normal(out=z[:m], dtype=self.dtype)
+            x = out[start : start + m] if out is not None else np.empty_like(z[:m])
+            # set x = zA^T
+            yield self._transform(np.matmul(z[:m], self._At, out=x))
+
+    def sample(self, n: int, out: np.ndarray = None) -> np.ndarray:
+        """n draws of shape (n, nVar), generated into out if given"""
+        if out is None:
+            out = np.empty((n, self.nVar), dtype=self.dtype)
+        for _ in self.chunks(n, out=out):
+            pass
+        return out
+
+
+class StudentTCopula(GaussianCopula):
+    """Student t copula over a fixed correlation matrix, see GaussianCopula"""
+
+    def __init__(
+        self, corrM: np.ndarray, degFree: int = 3, dtype: type = np.float64, seed=None
+    ):
+        super().__init__(corrM, dtype, seed)
+        self.degFree = degFree
+
+    def _transform(self, y: np.ndarray) -> np.ndarray:
+        # Simulate s from chiSq and set x = sqrt(df/s) * y
+        s = self.rng.chisquare(self.degFree, y.shape[0])
+        y *= np.sqrt(self.degFree / s).astype(self.dtype)[:, None]
+        # set u equal to cdf at x from T dist
+        return stdtr(self.dtype(self.degFree), y, out=y)
+
 
 class Copula:
     def __init__(self) -> None:
         pass
 
+    @staticmethod
+    def _dataframe(u: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(u, columns=[f"u{i}" for i in range(u.shape[1])])
+
+    def copulaGaussianChunks(
+        self,
+        nSims: int,
+        corrM: np.ndarray,
+        chunkSize: int = COPULA_CHUNK_SIZE,
+        dtype: type = np.float64,
+        seed=None,
+        out: np.ndarray = None,
+    ):
+        """
+        Gaussian copula uniforms, yielded as (chunkSize, nVar) arrays so that
+        very large simulations can be consumed without holding every draw.
+
+        params:
+            nSims: number of simulations
+            corrM: correlation matrix (nVar x nVar)
+            chunkSize: simulations per yielded block
+            dtype: np.float64 or np.float32
+            seed: seed or np.random.Generator
+            out: optional (nSims, nVar) array the blocks are written into
+        """
+        copula = GaussianCopula(corrM, dtype, seed)
+        yield from copula.chunks(nSims, chunkSize, out)
+
+    def copulaStudentTChunks(
+        self,
+        nSims: int,
+        corrM: np.ndarray,
+        degFree: int = 3,
+        chunkSize: int = COPULA_CHUNK_SIZE,
+        dtype: type = np.float64,
+        seed=None,
+        out: np.ndarray = None,
+    ):
+        """
+        Student t copula uniforms, yielded as (chunkSize, nVar) arrays.
+        See copulaGaussianChunks for the parameters.
+        """
+        copula = StudentTCopula(corrM, degFree, dtype, seed)
+        yield from copula.chunks(nSims, chunkSize, out)
+
     def copulaGaussian(
-        self, nSims: int, corrM: int, dataframe: bool = False
-    ) -> pd.DataFrame:
-        nVar = np.size(corrM, 0)
-        # Find nearest positive semi definite correlation matrix
-        psd = ct.corr_nearest(corrM)
-        # Calculate Cholesky Decomposition
-        A = np.linalg.cholesky(psd)
-        # Simulate nVar i.i.d. from N(0,1)
-        l = []
-        for i in range(nVar):
-            l.append(np.random.normal(0, 1, nSims).tolist())
-        z = np.array(l)
-        # set x = Az
-        x = np.matmul(A, z)
-        # set u equal to cdf at x from N(0,1)
-        u = sc.norm.cdf(x)
-        u = np.transpose(u)
+        self,
+        nSims: int,
+        corrM: np.ndarray,
+        dataframe: bool = False,
+        dtype: type = np.float64,
+        out: np.ndarray = None,
+        seed=None,
+    ) -> np.ndarray:
+        """
+        Gaussian copula uniforms of shape (nSims, nVar), generated block by
+        block into out (allocated if not given).
+        """
+        dtype = out.dtype if out is not None else dtype
+        u = GaussianCopula(corrM, dtype, seed).sample(nSims, out)
 
         # optional: return dataframe instead of array
-        if dataframe:
-            cols = []
-            for i in range(nVar):
-                cols.append("u" + str(i))
-            u = pd.DataFrame(u, columns=cols)
-
-        return u
+        return self._dataframe(u) if dataframe else u
 
     def copulaStudentT(
-        self, nSims: int, corrM: int, degFree: int = 3, dataframe: bool = False
-    ) -> pd.DataFrame:
-        nVar = np.size(corrM, 0)
-        # Find nearest positive semi definite correlation matrix
-        psd = ct.corr_nearest(corrM)
-        # Calculate Cholesky Decomposition
-        A = np.linalg.cholesky(psd)
-        # Simulate nVar i.i.d. from N(0,1)
-        l = []
-        for i in range(nVar):
-            l.append(np.random.normal(0, 1, nSims).tolist())
-        z = np.array(l)
-        # set y = Az
-        y = np.matmul(A, z)
-        # Simulate s from chiSq
-        s = np.random.chisquare(degFree, nSims)
-        # set x = sqrt(df/s) * y
-        x = np.sqrt(degFree / s) * y
-        # set u equal to cdf at x from T dist
-        u = sc.t.cdf(x, degFree)
-        u = np.transpose(u)
+        self,
+        nSims: int,
+        corrM: np.ndarray,
+        degFree: int = 3,
+        dataframe: bool = False,
+        dtype: type = np.float64,
+        out: np.ndarray = None,
+        seed=None,
+    ) -> np.ndarray:
+        """
+        Student t copula uniforms of shape (nSims, nVar), generated block by
+        block into out (allocated if not given).
+        """
+        dtype = out.dtype if out is not None else dtype
+        u = StudentTCopula(corrM, degFree, dtype, seed).sample(nSims, out)
 
         # optional: return dataframe instead of array
-        if dataframe:
-            cols = []
-            for i in range(nVar):
-                cols.append("u" + str(i))
-            u = pd.DataFrame(u, columns=cols)
-
-        return u
+        return self._dataframe(u) if dataframe else u
 
     def copulaInvClayton(
-        self, nSims: int, nVar: int, alpha: int, dataframe: pd.DataFrame = False
-    ) -> pd.DataFrame:
-        # generate random values for all variables
-        v = np.random.rand(nVar, nSims)
-
-        # apply clayton recursive formula
-        uAlphaSum = np.power(v[0], -alpha)
-        u = []
-        u.append(v[0].tolist())
-
-        for i in range(1, nVar):
-            a = uAlphaSum - (i + 1) + 2
-            b = np.power(v[i], alpha / (alpha * (1 - (i + 1)) - 1)) - 1
-            c = np.multiply(a, b) + 1
-            ui = np.power(c, -1 / alpha)
-            u.append(ui.tolist())
-            uAlphaSum = np.sum((uAlphaSum, np.power(ui, -alpha)), axis=0)
-        u = np.array(u)
-
+        self,
+        nSims: int,
+        nVar: int,
+        alpha: float,
+        dataframe: bool = False,
+        dtype: type = np.float64,
+        seed=None,
+    ) -> np.ndarray:
+        """
+        Survival Clayton copula uniforms of shape (nSims, nVar), sampled with
+        the Marshall-Olkin gamma frailty construction: one V ~ Gamma(1/alpha)
+        per simulation shared by every variable, E ~ Exp(1) per variable and
+        U = (1 + E/V)^(-1/alpha). Returns 1 - U so the dependence sits in the
+        upper tail.
+        """
+        if alpha <= 0:
+            raise ValueError(f"Clayton alpha must be positive, got {alpha}")
+        rng = np.random.default_rng(seed)
+        # generate the shared frailty and an exponential for every variable
+        v = rng.standard_gamma(1 / alpha, size=(nSims, 1)).astype(dtype)
+        u = rng.standard_exponential((nSims, nVar), dtype=dtype)
+
+        # u = 1 - (1 + e/v)^(-1/alpha), in place
+        u /= v
+        np.log1p(u, out=u)
+        u *= -1 / alpha
         # inverse result to concentrate correlation in tails
-        u = (u - 1) * -1
-        u = np.transpose(u)
+        np.expm1(u, out=u)
+        np.negative(u, out=u)
 
         # optional: return dataframe instead of array
-        if dataframe:
-            cols = []
-            for i in range(nVar):
-                cols.append("u" + str(i))
-            u = pd.DataFrame(u, columns=cols)
-
-        return u
+        return self._dataframe(u) if dataframe else u
 
 
 # if __name__ == "__main__":
@@ -0,0 +1,114 @@
+"""
+PURPOSE:  Rating factor tables compiled from csv into integer-coded arrays
+
+CREATED:  2026/10/18
+"""
+
+import os
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+from functools import cached_property
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class RatingTable:
+    """
+    One rating factor: codes[i] has id i and rate rates[i]. Lookups map codes
+    to ids with a hash index and gather the rates.
+    """
+
+    name: str
+    codes: np.ndarray
+    rates: np.ndarray
+
+    @cached_property
+    def index(self) -> pd.Index:
+        return pd.Index(self.codes)
+
+    @cached_property
+    def as_dict(self) -> Dict:
+        return dict(zip(self.codes.tolist(), self.rates.tolist()))
+
+    def ids(self, values) -> np.ndarray:
+        ids = self.index.get_indexer(values)
+        if np.any(ids < 0):
+            unknown = sorted(set(np.asarray(values)[ids < 0].tolist()))
+            raise KeyError(f"Unknown {self.name}: {unknown}")
+        return ids
+
+    def lookup(self, values) -> np.ndarray:
+        return self.rates[self.ids(values)]
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class CompiledRatingTables:
+    """
+    Rating tables stored in a csv as side by side (code, rate) column pairs.
+
+    Nothing is read on construction. On first use the csv is hashed and the
+    tables are loaded from <cache_dir>/<csv stem>-<hash>.npz, compiling the
+    csv into that file if it does not exist yet. The csv's mtime and size are
+    checked on every access, so edits to the csv are picked up automatically.
+
+    params:
+        path: csv file
+        columns: table name -> position of its code column (rate column follows)
+        cache_dir: where compiled tables are kept
+    """
+
+    def __init__(
+        self, path: str, columns: Dict[str, int], cache_dir: Optional[str] = None
+    ) -> None:
+        self.path = Path(path)
+        self.columns = columns
+        self.cache_dir = Path(cache_dir) if cache_dir else self.path.parent / ".cache"
+        self._signature = None
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _compile(self, cache_file: Path) -> None:
+        metadata = pd.read_csv(self.path)
+        arrays = {}
+        for name, col in self.columns.items():
+            pairs = metadata.iloc[:, col : col + 2].dropna()
+            arrays[f"{name}_codes"] = pairs.iloc[:, 0].to_numpy().astype(str)
+            arrays[f"{name}_rates"] = pairs.iloc[:, 1].to_numpy(dtype=float)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale in self.cache_dir.glob(f"{self.path.stem}-*.npz"):
+            stale.unlink()
+        np.savez(cache_file, **arrays)
+
+    def _load(self) -> None:
+        cache_file = self.cache_dir / f"{self.path.stem}-{file_hash(self.path)}.npz"
+        if not cache_file.exists():
+            self._compile(cache_file)
+        with np.load(cache_file) as compiled:
+            self._tables = {
+                name: RatingTable(
+                    name, compiled[f"{name}_codes"], compiled[f"{name}_rates"]
+                )
+                for name in self.columns
+            }
+
+    @property
+    def tables(self) -> Dict[str, RatingTable]:
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if signature != self._signature:
+                self._load()
+                self._signature = signature
+        return self._tables
+
+    def __getitem__(self, name: str) -> RatingTable:
+        return self.tables[name]
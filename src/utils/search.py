@@ -0,0 +1,206 @@
+"""
+PURPOSE:  Full-text article search on SQLite FTS5 indexes kept in their own
+          database and synced to the article tables by rowid
+
+CREATED:  2026/10/18
+"""
+
+import re
+import time
+import sqlite3
+import logging
+import threading
+import numpy as np
+
+from pathlib import Path
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# "quoted phrase" or a bare term, optionally ending in * for a prefix
+QUERY_TOKEN = re.compile(r'"([^"]*)"?|(\S+)')
+
+
+def fts_query(search: str) -> Optional[str]:
+    """
+    FTS5 MATCH expression for a search box string. Quoted text is matched as
+    a phrase; every other term is matched as a prefix, so results narrow as
+    the user types. Terms are ANDed and matching is case-insensitive.
+
+    params:
+        search: text typed by the user
+
+    returns:
+        MATCH expression, or None when there is nothing to search for
+    """
+    parts = []
+    for phrase, term in QUERY_TOKEN.findall(search):
+        text = (phrase or term).replace('"', '""')
+        # only word characters reach the index, so skip pure punctuation
+        if not re.search(r"\w", text):
+            continue
+        if phrase:
+            parts.append(f'"{text}"')
+        else:
+            parts.append(f'"{text.rstrip("*")}"*')
+    return " AND ".join(parts) or None
+
+
+class ArticleSearch:
+    """
+    Inverted indexes over the Title and Description of article tables, one
+    contentless FTS5 table <table>_fts each, holding only the index and the
+    article rowids. The unicode61 tokenizer case-folds and strips diacritics.
+
+    The indexes live in their own database, with the article database
+    attached read-only, so searching never writes to the database that
+    load_data's cache watches.
+
+    Indexes are synced lazily before each search. While PRAGMA data_version
+    of the article database is unchanged nothing has been committed to it,
+    so the check is free. Otherwise, if the table has only grown (rows past
+    the indexed watermark, none removed at or below it) the new rows are
+    added; any other commit, such as an in-place update or a delete, rebuilds
+    the index, as does the first sync of a process since the table may have
+    changed in between. The watermark and row count are kept in the fts_sync
+    table. As in SQLiteTableCache, rows edited in place alongside an append
+    keep their old index entries until the next rebuild.
+
+    params:
+        path: SQLite database holding the article tables
+        index_path: SQLite database the indexes are kept in
+    """
+
+    COLUMNS = ["Title", "Description"]
+
+    def __init__(self, path: str, index_path: str) -> None:
+        self.path = path
+        self.index_path = index_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        # article database data_version each table was last synced at
+        self._synced: Dict[str, int] = {}
+        self.searches = 0
+        self.search_seconds = 0.0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # connections are used under the lock only, so one is shared by threads
+        if self._conn is None:
+            Path(self.index_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.index_path, uri=True, check_same_thread=False
+            )
+            articles = Path(self.path).resolve().as_uri()
+            self._conn.execute(
+                "ATTACH DATABASE ? AS articles", (f"{articles}?mode=ro",)
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fts_sync "
+                "(name TEXT PRIMARY KEY, watermark INTEGER, rows INTEGER)"
+            )
+        return self._conn
+
+    def _state(self, table: str) -> Tuple[Optional[int], int]:
+        row = self.conn.execute(
+            "SELECT watermark, rows FROM fts_sync WHERE name = ?", (table,)
+        ).fetchone()
+        return row if row is not None else (None, 0)
+
+    def _count(self, table: str, upto: Optional[int]) -> int:
+        if upto is None:
+            return 0
+        query = f"SELECT count(*) FROM articles.{table} WHERE rowid <= ?"
+        return self.conn.execute(query, (upto,)).fetchone()[0]
+
+    def sync(self, table: str) -> None:
+        """Bring table's index up to date with the table, see the class notes"""
+        columns = ", ".join(self.COLUMNS)
+        fts = f"{table}_fts"
+        with self._lock, self.conn as conn:
+            version = conn.execute("PRAGMA articles.data_version").fetchone()[0]
+            if self._synced.get(table) == version:
+                return
+
+            conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"{columns}, content='', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+            max_rowid = f"SELECT max(rowid) FROM articles.{table}"
+            upto = conn.execute(max_rowid).fetchone()[0]
+            watermark, rows = self._state(table)
+            start = time.perf_counter()
+            if (
+                table in self._synced
+                and watermark is not None
+                and upto is not None
+                and upto > watermark
+                and self._count(table, watermark) == rows
+            ):
+                conn.execute(
+                    f"INSERT INTO {fts} (rowid, {columns}) "
+                    f"SELECT rowid, {columns} FROM articles.{table} WHERE rowid > ?",
+                    (watermark,),
+                )
+                action = "appended to"
+            else:
+                conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('delete-all')")
+                conn.execute(
+                    f"INSERT INTO {fts} (rowid, {columns}) "
+                    f"SELECT rowid, {columns} FROM articles.{table}"
+                )
+                action = "rebuilt"
+            conn.execute(
+                "INSERT OR REPLACE INTO fts_sync VALUES (?, ?, ?)",
+                (table, upto, self._count(table, upto)),
+            )
+            elapsed = time.perf_counter() - start
+            logging.info(f"{fts} {action} in {elapsed:.2f}s")
+            self._synced[table] = version
+
+    def search(
+        self,
+        table: str,
+        search: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        rowids of the table's articles matching a search box string (see
+        fts_query), optionally within a date range
+
+        params:
+            table: article table to search
+            search: text typed by the user
+            start_date, end_date: inclusive range on the article Date
+
+        returns:
+            matching rowids, or None when search holds no terms (no filter)
+        """
+        query = fts_query(search)
+        if query is None:
+            return None
+        fts = f"{table}_fts"
+        sql = f"SELECT {fts}.rowid FROM {fts}"
+        if start_date is not None or end_date is not None:
+            sql += f" JOIN articles.{table} a ON a.rowid = {fts}.rowid"
+        sql += f" WHERE {fts} MATCH ?"
+        params: List = [query]
+        # Date is stored as ISO text, so ranges compare as strings
+        if start_date is not None:
+            sql += " AND a.Date >= ?"
+            params.append(start_date.isoformat())
+        if end_date is not None:
+            sql += " AND a.Date < ?"
+            params.append((end_date + timedelta(days=1)).isoformat())
+
+        with self._lock:
+            self.sync(table)
+            start = time.perf_counter()
+            rowids = self.conn.execute(sql, params).fetchall()
+            self.searches += 1
+            self.search_seconds += time.perf_counter() - start
+        return np.array([rowid for (rowid,) in rowids], dtype=np.int64)
+
+    def stats(self) -> Dict:
+        return {"searches": self.searches, "search_seconds": self.search_seconds}
@@ -0,0 +1,157 @@
+"""
+PURPOSE:  Mergeable running statistics for streamed simulation output
+
+CREATED:  2026/10/18
+"""
+
+import numpy as np
+
+
+class RunningMoments:
+    """
+    Count, mean and variance of a stream of values, updated one chunk at a
+    time with the parallel (Chan et al.) combination of partial moments.
+    """
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x: np.ndarray) -> "RunningMoments":
+        x = np.asarray(x)
+        if x.size == 0:
+            return self
+        chunk = RunningMoments()
+        chunk.n = x.size
+        chunk.mean = float(np.mean(x, dtype=np.float64))
+        chunk.m2 = float(np.sum((x - chunk.mean) ** 2, dtype=np.float64))
+        return self.merge(chunk)
+
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        n = self.n + other.n
+        if n == 0:
+            return self
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta**2 * self.n * other.n / n
+        self.n = n
+        return self
+
+    def var(self, ddof: int = 0) -> float:
+        return self.m2 / (self.n - ddof) if self.n > ddof else np.nan
+
+    def std(self, ddof: int = 0) -> float:
+        return np.sqrt(self.var(ddof))
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch for non-negative values (DDSketch style).
+
+    Every value x > 0 is counted in bucket k = ceil(log(x) / log(gamma)) with
+    gamma = (1 + a) / (1 - a), so any quantile is returned within relative
+    error a of the true value. Zeros are counted separately. Sketches with the
+    same accuracy merge by adding bucket counts, so chunks (or workers) can be
+    summarised independently and combined.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.005) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.zero_count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def n(self) -> int:
+        return int(self.zero_count + self.counts.sum())
+
+    def _grow(self, low: int, high: int) -> None:
+        if self.counts.size == 0:
+            self.offset = low
+            self.counts = np.zeros(high - low + 1, dtype=np.int64)
+            return
+        start = min(low, self.offset)
+        stop = max(high, self.offset + self.counts.size - 1)
+        counts = np.zeros(stop - start + 1, dtype=np.int64)
+        counts[
+            self.offset - start : self.offset - start + self.counts.size
+        ] = self.counts
+        self.offset = start
+        self.counts = counts
+
+    def update(self, x: np.ndarray) -> "QuantileSketch":
+        x = np.asarray(x, dtype=np.float64).ravel()
+        if x.size == 0:
+            return self
+        if np.any(x < 0):
+            raise ValueError("QuantileSketch only accepts non-negative values")
+        self.min = min(self.min, x.min())
+        self.max = max(self.max, x.max())
+        positive = x[x > 0]
+        self.zero_count += x.size - positive.size
+        if positive.size:
+            keys = np.ceil(np.log(positive) / self._log_gamma).astype(np.int64)
+            low, high = keys.min(), keys.max()
+            if (
+                self.counts.size == 0
+                or low < self.offset
+                or high >= self.offset + self.counts.size
+            ):
+                self._grow(low, high)
+            self.counts += np.bincount(keys - self.offset, minlength=self.counts.size)
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if not np.isclose(self.gamma, other.gamma):
+            raise ValueError("Cannot merge sketches with different accuracy")
+        if other.counts.size:
+            self._grow(other.offset, other.offset + other.counts.size - 1)
+            start = other.offset - self.offset
+            self.counts[start : start + other.counts.size] += other.counts
+        self.zero_count += other.zero_count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _buckets(self):
+        """Bucket representative values and counts, zero bucket first"""
+        keys = np.arange(self.offset, self.offset + self.counts.size)
+        values = 2 * self.gamma**keys / (self.gamma + 1)
+        values = np.clip(values, max(self.min, 0), self.max)
+        return (
+            np.concatenate(([0.0], values)),
+            np.concatenate(([self.zero_count], self.counts)),
+        )
+
+    def quantile(self, q: float) -> np.ndarray:
+        """
+        params:
+            q: probability (or array of probabilities) in [0, 1]
+
+        returns:
+            approximate value(s) at q
+        """
+        values, counts = self._buckets()
+        rank = np.asarray(q) * (self.n - 1)
+        idx = np.searchsorted(np.cumsum(counts), rank, side="right")
+        return values[np.minimum(idx, values.size - 1)]
+
+    def tail_mean(self, q: float) -> float:
+        """
+        Mean of the values above the q quantile (ie TVaR at probability q)
+        """
+        values, counts = self._buckets()
+        tail = self.n * (1 - q)
+        if tail <= 0:
+            return float(self.max)
+        # take whole buckets from the top until the tail mass is used up
+        from_top = np.cumsum(counts[::-1])
+        taken = np.minimum(
+            counts[::-1], np.maximum(tail - (from_top - counts[::-1]), 0)
+        )
+        return float(np.sum(taken * values[::-1]) / tail)
@@ -0,0 +1,162 @@
+"""
+PURPOSE:  Process-wide cache of frames built from SQLite tables, rebuilt only
+          when the database changes and extended in place when rows are appended
+
+CREATED:  2026/10/18
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+import pandas as pd
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+# rowid lower bound used for a full load
+MIN_ROWID = -(2**63)
+
+# load(conn, after, upto): frame of the table's rows with after < rowid <= upto,
+# where upto is None for an empty table
+Loader = Callable[[sqlite3.Connection, int, Optional[int]], pd.DataFrame]
+
+
+@dataclass
+class _Entry:
+    signature: Tuple
+    frame: pd.DataFrame
+    # highest rowid loaded, and the number of table rows at or below it
+    watermark: Optional[int]
+    rows: int
+
+
+class SQLiteTableCache:
+    """
+    Thread-safe cache of one frame per table of a SQLite database, shared by
+    every session of the process. A cached frame is reused until the table's
+    change signature moves:
+
+        - PRAGMA data_version on the cache's own persistent connection, which
+          changes whenever another connection commits to the database
+        - the database file's mtime and size, for writers that replace the file
+        - the table's max rowid, the watermark of appended rows
+
+    Checking the signature costs a stat and two indexed queries, so reruns
+    never re-read or re-tidy an unchanged table. Callers get a shallow copy
+    so reassigning columns does not leak into the shared frame.
+
+    When the table has only grown (rows past the watermark, none removed at or
+    below it) just the new rows are loaded and merged into the cached frame, so
+    a refresh costs in proportion to the new rows. Anything else, such as a
+    delete, rebuilds the frame from scratch. Rows edited in place alongside an
+    append keep their cached values until the next full rebuild (see clear).
+
+    params:
+        path: SQLite database file
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.appends = 0
+        self.rebuild_seconds = 0.0
+        self.append_seconds = 0.0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # connections are used under the lock only, so one is shared by threads
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        return self._conn
+
+    def signature(self, table: str) -> Tuple:
+        stat = os.stat(self.path)
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        max_rowid = self.conn.execute(f"SELECT max(rowid) FROM {table}").fetchone()[0]
+        return (data_version, stat.st_mtime_ns, stat.st_size, max_rowid)
+
+    def _count(self, table: str, upto: Optional[int]) -> int:
+        if upto is None:
+            return 0
+        query = f"SELECT count(*) FROM {table} WHERE rowid <= ?"
+        return self.conn.execute(query, (upto,)).fetchone()[0]
+
+    def get(
+        self,
+        table: str,
+        load: Loader,
+        sort_by: Optional[List[str]] = None,
+        ascending: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Cached frame for table, calling load to (re)create it when the table
+        has changed since it was last built, or only for the appended rows
+
+        params:
+            table: table the frame is built from
+            load: reads and tidies the rows after < rowid <= upto
+            sort_by, ascending: order kept when appended rows are merged in
+
+        returns:
+            shallow copy of the cached frame
+        """
+        with self._lock:
+            signature = self.signature(table)
+            entry = self._entries.get(table)
+            if entry is not None and entry.signature == signature:
+                self.hits += 1
+                return entry.frame.copy(deep=False)
+
+            self.misses += 1
+            upto = signature[-1]
+            start = time.perf_counter()
+            if (
+                entry is not None
+                and entry.watermark is not None
+                and upto is not None
+                and upto > entry.watermark
+                and self._count(table, entry.watermark) == entry.rows
+            ):
+                new = load(self.conn, entry.watermark, upto)
+                if new.empty:
+                    # nothing survived tidying: keep the frame, move the watermark
+                    frame = entry.frame
+                else:
+                    frame = pd.concat([new, entry.frame], ignore_index=True)
+                if sort_by is not None and not new.empty:
+                    frame = frame.sort_values(
+                        sort_by, ascending=ascending, kind="stable"
+                    ).reset_index(drop=True)
+                elapsed = time.perf_counter() - start
+                self.appends += 1
+                self.append_seconds += elapsed
+                logging.info(f"{table} appended {len(new):,} rows in {elapsed:.2f}s")
+            else:
+                frame = load(self.conn, MIN_ROWID, upto)
+                elapsed = time.perf_counter() - start
+                self.rebuild_seconds += elapsed
+                logging.info(f"{table} rebuilt in {elapsed:.2f}s")
+            self._entries[table] = _Entry(
+                signature, frame, upto, self._count(table, upto)
+            )
+            return frame.copy(deep=False)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "appends": self.appends,
+            "rebuild_seconds": self.rebuild_seconds,
+            "append_seconds": self.append_seconds,
+            "tables": list(self._entries),
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -49,6 +49,30 @@ class Utils:
         except ZeroDivisionError:
             return 0
 
+    def segment_sum(self, values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """
+        Sum consecutive runs of values where run i has length counts[i]
+        (eg individual claims into annual totals). Empty runs sum to 0.
+        """
+        counts = np.asarray(counts)
+        totals = np.zeros(counts.shape[0], dtype=values.dtype)
+        filled = counts > 0
+        if values.size:
+            offsets = np.cumsum(counts) - counts
+            totals[filled] = np.add.reduceat(values, offsets[filled])
+        return totals
+
+    def ranks(self, x: np.ndarray, axis: int = -1) -> np.ndarray:
+        """0-based ranks of x along axis (one argsort plus a scatter)"""
+        order = np.argsort(x, axis=axis)
+        ranks = np.empty_like(order)
+        shape = [1] * x.ndim
+        shape[axis] = -1
+        np.put_along_axis(
+            ranks, order, np.arange(x.shape[axis]).reshape(shape), axis=axis
+        )
+        return ranks
+
     def display_pdf(self, file) -> None:
         # Opening file from file path
         with open(file, "rb") as f:
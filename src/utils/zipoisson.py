@@ -1,9 +1,13 @@
 import scipy.stats as stats
 import numpy as np
-from src.utils.utils import utils
 
 
 class ZIPoisson(stats.rv_discrete):
+    """
+    Zero-inflated Poisson: a structural zero with probability p, otherwise a
+    Poisson(mu) count. pmf, cdf, ppf and rvs are closed form over arrays.
+    """
+
     def __init__(self, p, mu, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.p = p
@@ -11,14 +15,32 @@ class ZIPoisson(stats.rv_discrete):
         self.bernoulli = stats.bernoulli(self.p)
         self.poisson = stats.poisson(self.mu)
 
-    def zi_pmf(self, x):
-        if x == 0:
-            pmf = self.p + (1 - self.p) * np.exp(-self.mu)
-        else:
-            pmf = (1 - self.p) * (
-                (self.mu**x * np.exp(-self.mu)) / np.math.factorial(int(x))
-            )
-        return pmf
+    def _logpmf(self, x):
+        logpmf = np.log1p(-self.p) + self.poisson.logpmf(x)
+        return np.where(
+            x == 0, np.log(self.p + (1 - self.p) * np.exp(-self.mu)), logpmf
+        )
 
     def _pmf(self, x):
-        return utils.vectorize(self.zi_pmf, x)
+        return np.exp(self._logpmf(x))
+
+    def _cdf(self, x):
+        return self.p + (1 - self.p) * self.poisson.cdf(x)
+
+    def _sf(self, x):
+        return (1 - self.p) * self.poisson.sf(x)
+
+    def _ppf(self, q):
+        # every q below the zero mass maps to a Poisson probability <= 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            poisson_q = np.clip((q - self.p) / (1 - self.p), 0, 1)
+        return np.maximum(self.poisson.ppf(np.nan_to_num(poisson_q)), 0)
+
+    def _rvs(self, size=None, random_state=None):
+        counts = random_state.poisson(self.mu, size)
+        return np.where(random_state.random(size) < self.p, 0, counts)
+
+    def _stats(self):
+        mean = (1 - self.p) * self.mu
+        var = mean * (1 + self.p * self.mu)
+        return mean, var, None, None